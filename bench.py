@@ -0,0 +1,20 @@
+# encoder profile comparison on this machine, run
+# `python3 bench.py <episode.mkv> [seconds] [x265,slow x264,medium,animation ...]`
+# with the same .env as the bot
+
+import asyncio
+import sys
+
+from core.bench import EncoderBench
+
+if len(sys.argv) < 2:
+    sys.exit("usage: python3 bench.py <episode.mkv> [seconds] [profiles]")
+
+args = sys.argv[2:]
+seconds = int(args.pop(0)) if args and args[0].isdigit() else 60
+bench = EncoderBench(sys.argv[1], args, seconds)
+
+try:
+    asyncio.run(bench.run())
+except KeyboardInterrupt:
+    pass
@@ -1,23 +1,21 @@
-from traceback import format_exc
 from telethon import Button, events
 from core.bot import Bot
-from core.executors import Executors
+from core.pipeline import Pipeline
 from database import DataBase
-from functions.info import AnimeInfo
 from functions.schedule import ScheduleTasks, Var
-from functions.tools import Tools, asyncio
+from functions.tools import Tools
 from functions.utils import AdminUtils
 from libs.ariawarp import Torrent
-from libs.logger import LOGS, Reporter
 from libs.subsplease import SubsPlease
 
 tools = Tools()
 tools.init_dir()
 bot = Bot()
 dB = DataBase()
-subsplease = SubsPlease(dB)
 torrent = Torrent()
-schedule = ScheduleTasks(bot)
+pipeline = Pipeline(bot, dB, torrent)
+subsplease = SubsPlease(dB, pipeline)
+schedule = ScheduleTasks(bot, pipeline)
 admin = AdminUtils(dB, bot)
 
 @bot.on(
@@ -50,6 +48,7 @@ async def _start(event):
         if msg_id.isdigit():
             msg = await bot.get_messages(Var.BACKUP_CHANNEL, ids=int(msg_id))
             await event.reply(msg)
+            await dB.add_file_demand(int(msg_id))
         else:
             items = await dB.get_store_items(msg_id)
             if items:
@@ -88,6 +87,18 @@ async def _(e):
 async def _(e):
     await admin._restart(e, schedule)
 
+@bot.on(events.callbackquery.CallbackQuery(data="psta"))
+async def _(e):
+    await admin._pipeline_status(e, pipeline)
+
+@bot.on(events.callbackquery.CallbackQuery(data="etsk"))
+async def _(e):
+    await admin._episode_tasks(e)
+
+@bot.on(events.callbackquery.CallbackQuery(data="ecan"))
+async def _(e):
+    await admin._cancel_tasks(e)
+
 @bot.on(events.callbackquery.CallbackQuery(data="entg"))
 async def _(e):
     await admin._encode_t(e)
@@ -109,85 +120,20 @@ async def _(e):
     await e.edit(buttons=admin.admin_panel())
 
 async def anime(data):
-    try:
-        # ✅ Ensure all resolutions are processed correctly
-        torr = [
-            data.get("360p"),
-            data.get("480p"),
-            data.get("720p"),
-            data.get("1080p"),
-        ]
-        
-        anime_info = AnimeInfo(torr[0]["title"])  # Using dict-based data
-        poster = await tools._poster(bot, anime_info)
-
-        if await dB.is_separate_channel_upload():
-            chat_info = await tools.get_chat_info(bot, anime_info, dB)
-            await poster.edit(
-                buttons=[
-                    [
-                        Button.url(
-                            f"EPISODE {anime_info.data.get('episode_number', '')}".strip(),
-                            url=chat_info["invite_link"],
-                        )
-                    ]
-                ]
-            )
-            poster = await tools._poster(bot, anime_info, chat_info["chat_id"])
-
-        btn = [[]]
-        original_upload = await dB.is_original_upload()
-        button_upload = await dB.is_button_upload()
-
-        for i in torr:
-            if not i:
-                continue  # ✅ Skip if a resolution is missing
-
-            try:
-                filename = f"downloads/{i['title']}"
-                reporter = Reporter(bot, i["title"])
-                await reporter.alert_new_file_founded()
-
-                if i.get("link", "").startswith("magnet:"):  # ✅ Handle Torrent
-                    await torrent.download_magnet(i["link"], "./downloads/")
-
-                exe = Executors(
-                    bot,
-                    dB,
-                    {
-                        "original_upload": original_upload,
-                        "button_upload": button_upload,
-                    },
-                    filename,
-                    AnimeInfo(i["title"]),
-                    reporter,
-                )
-                result, _btn = await exe.execute()
-
-                if result:
-                    if _btn:
-                        if len(btn[0]) == 2:
-                            btn.append([_btn])
-                        else:
-                            btn[0].append(_btn)
-                        await poster.edit(buttons=btn)
-
-                    asyncio.ensure_future(exe.further_work())
-                    continue
-
-                await reporter.report_error(_btn, log=True)
-                await reporter.msg.delete()
-
-            except BaseException:
-                await reporter.report_error(str(format_exc()), log=True)
-                await reporter.msg.delete()
-
-    except BaseException:
-        LOGS.error(str(format_exc()))
+    if Var.PIPELINE_MODE:
+        return await pipeline.submit(data)
+    await pipeline.run(data)
+
+
+async def main():
+    await pipeline.resume()
+    await subsplease.on_new_anime(anime)
 
 try:
-    bot.loop.run_until_complete(subsplease.on_new_anime(anime))
+    bot.loop.run_until_complete(main())
     bot.run()
 except KeyboardInterrupt:
+    if torrent.aria2:
+        bot.loop.run_until_complete(torrent.aria2.shutdown())
     subsplease._exit()
     
@@ -0,0 +1,127 @@
+#    This file is part of the AutoAnime distribution.
+#    Copyright (c) 2025 Kaif_00z
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, version 3.
+#
+#    This program is distributed in the hope that it will be useful, but
+#    WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+#    General Public License for more details.
+#
+# License can be found in <
+# https://github.com/kaif-00z/AutoAnimeBot/blob/main/LICENSE > .
+
+# if you are using this following code then don't forgot to give proper
+# credit to t.me/kAiF_00z (github.com/kaif-00z)
+
+import os
+import time
+
+from functions.allocator import Allocation, allocator
+from functions.config import Var
+from functions.encoders import EncoderProfile
+from functions.resources import CRITICAL
+from functions.tools import Tools
+from libs.logger import LOGS
+from libs.progress import ProgressParser
+
+DEFAULT_PROFILES = [
+    "x265,ultrafast",
+    "x265,veryfast",
+    "x265,medium,animation",
+    "x264,veryfast",
+    "x264,medium,animation",
+    "svtav1,10",
+    "svtav1,8",
+]
+
+
+class EncoderBench:
+    """Encodes the same clip with every profile and compares them.
+
+    Each run gets all the cores the bot would hand to one encode, so the
+    numbers are the throughput/size trade-off on this machine.
+    """
+
+    def __init__(self, dl, profiles=None, seconds=60, crf=None):
+        self.dl = dl
+        self.profiles = [EncoderProfile.parse(i) for i in profiles or DEFAULT_PROFILES]
+        self.seconds = seconds
+        self.crf = crf or Var.CRF
+        self.tools = Tools()
+
+    async def run(self):
+        tsec = await self.tools.genss(self.dl)
+        self.seconds = min(self.seconds, tsec)
+        # skip the opening, it compresses unlike the rest of an episode
+        start = max(0, min(tsec // 5, tsec - self.seconds))
+        allocation = Allocation(allocator.cores())
+        results = [
+            await self.encode(profile, start, allocation) for profile in self.profiles
+        ]
+        self.report(results)
+        return results
+
+    async def encode(self, profile, start, allocation):
+        out = f"bench-{time.time()}.mkv"
+        try:
+            result = await self.tools.supervisor.run(
+                [
+                    Var.FFMPEG,
+                    "-hide_banner",
+                    "-loglevel",
+                    "error",
+                    "-progress",
+                    "pipe:1",
+                    "-ss",
+                    str(start),
+                    "-i",
+                    self.dl,
+                    "-t",
+                    str(self.seconds),
+                    "-map",
+                    "0:v:0",
+                    *profile.args(self.crf, allocation),
+                    "-threads",
+                    str(allocation.threads),
+                    out,
+                    "-y",
+                ],
+                resource=CRITICAL,
+                timeout=Var.ENCODE_TIMEOUT,
+                stall=Var.STALL_TIMEOUT,
+                name=str(profile),
+                progress=ProgressParser(),
+            )
+            frames = result.stats.frames
+            if not result.ok or not frames or not os.path.exists(out):
+                LOGS.error(f"{profile} Failed: {result.error}")
+                return profile, None
+            return profile, {
+                "frames": frames,
+                "fps": frames / max(result.stats.wall, 0.001),
+                "size": os.path.getsize(out),
+                "wall": result.stats.wall,
+                "cpu": result.stats.cpu,
+            }
+        finally:
+            if os.path.exists(out):
+                os.remove(out)
+
+    def report(self, results):
+        print(
+            f"{'Profile':<28}{'FPS':>8}{'Size':>12}{'kbps':>8}"
+            f"{'Wall':>8}{'CPU':>8}"
+        )
+        for profile, stats in results:
+            if not stats:
+                print(f"{str(profile):<28}{'failed':>8}")
+                continue
+            kbps = stats["size"] * 8 / self.seconds / 1000
+            print(
+                f"{str(profile):<28}{stats['fps']:>8.1f}"
+                f"{self.tools.hbs(stats['size']):>12}{kbps:>8.0f}"
+                f"{stats['wall']:>7.1f}s{stats['cpu']:>7.1f}s"
+            )
@@ -26,6 +26,7 @@ from traceback import format_exc
 from telethon import Button
 
 from core.bot import LOGS, Bot, Var
+from core.taskgraph import TaskGraph
 from database import DataBase
 from functions.info import AnimeInfo
 from functions.tools import Tools
@@ -48,16 +49,24 @@ class Executors:
         self.bot = bot
         self.input_file = input_file
         self.tools = Tools()
+        self.encoder = self.tools
         self.db = dB
         self.reporter = reporter
         self.msg_id = None
         self.output_file = None
+        self.thumb = None
+        self.ss_path = None
+        self.sample_path = None
+        # fifo the input is read from while it still downloads
+        self.stream = None
 
-    async def execute(self):
+    async def encode(self):
         try:
             rename = await self.anime_info.rename(self.is_original)
             self.output_file = f"encode/{rename}"
-            thumb = await self.tools.cover_dl((await self.anime_info.get_poster()))
+            self.thumb = await self.tools.cover_dl(
+                (await self.anime_info.get_poster())
+            )
             if self.is_original:
                 await self.reporter.started_renaming()
                 succ, out = await self.tools.rename_file(
@@ -67,47 +76,84 @@ class Executors:
                     return False, out
             else:
                 _log_msg = await self.reporter.started_compressing()
-                succ, _new_msg = await self.tools.compress(
-                    self.input_file, self.output_file, _log_msg
+                if Var.SINGLE_PASS:
+                    self.ss_path = secrets.token_hex(nbytes=7)
+                # a copied sample is cut from the output later, almost for free
+                if Var.SINGLE_PASS and Var.SAMPLE_MODE == "encode":
+                    self.sample_path = (
+                        self.output_file.split(".mkv")[-2] + "_sample.mkv"
+                    )
+                succ, _new_msg = await self.encoder.compress(
+                    self.input_file,
+                    self.output_file,
+                    _log_msg,
+                    self.ss_path,
+                    self.sample_path,
+                    self.stream,
                 )
                 if not succ:
                     return False, _new_msg
                 self.reporter.msg = _new_msg
+            return True, self.output_file
+        except BaseException:
+            await self.reporter.report_error(str(format_exc()), log=True)
+            return False, str(format_exc())
+
+    async def upload(self):
+        try:
+            rename = self.output_file.split("/")[-1]
+            if not self.thumb:
+                self.thumb = await self.tools.cover_dl(
+                    (await self.anime_info.get_poster())
+                )
+            thumb = self.thumb or "thumb.jpg"
             await self.reporter.started_uploading()
             if self.is_button:
                 msg = await self.bot.upload_anime(
-                    self.output_file, rename, thumb or "thumb.jpg", is_button=True
-                )
-                btn = Button.url(
-                    f"{self.anime_info.data.get('video_resolution')}",
-                    url=f"https://t.me/{((await self.bot.get_me()).username)}?start={msg.id}",
+                    self.output_file, rename, thumb, is_button=True
                 )
                 self.msg_id = msg.id
-                return True, btn
-            msg = await self.bot.upload_anime(
-                self.output_file, rename, thumb or "thumb.jpg"
-            )
+                return True, (await self.button())
+            msg = await self.bot.upload_anime(self.output_file, rename, thumb)
             self.msg_id = msg.id
             return True, []
         except BaseException:
             await self.reporter.report_error(str(format_exc()), log=True)
             return False, str(format_exc())
 
+    async def button(self):
+        return Button.url(
+            f"{self.anime_info.data.get('video_resolution')}",
+            url=f"https://t.me/{((await self.bot.get_me()).username)}?start={self.msg_id}",
+        )
+
     def run_further_work(self):
         asyncio.run(self.further_work())
 
-    async def further_work(self):
+    async def further_work(self, graph=None, hold=()):
+        if not self.msg_id:
+            return
+        own = graph is None
+        graph = graph or TaskGraph(self.anime_info.name)
+        key = self.anime_info.data.get("video_resolution") or self.output_file
         try:
-            if self.msg_id:
-                await self.reporter.started_gen_ss()
-                msg = await self.bot.get_messages(
-                    Var.BACKUP_CHANNEL if self.is_button else Var.MAIN_CHANNEL,
-                    ids=self.msg_id,
-                )
-                btn = [
-                    [],
-                ]
-                link_info = await self.tools.mediainfo(self.output_file, self.bot)
+            await self.reporter.started_gen_ss()
+            msg = await self.bot.get_messages(
+                Var.BACKUP_CHANNEL if self.is_button else Var.MAIN_CHANNEL,
+                ids=self.msg_id,
+            )
+            btn = [
+                [],
+            ]
+            # made by a single pass encode, unless it was resumed or remote
+            premade = self.ss_path and glob(f"{self.ss_path}/*")
+            _hash = self.ss_path if premade else secrets.token_hex(nbytes=7)
+
+            async def mediainfo():
+                return await self.tools.mediainfo(self.output_file, self.bot)
+
+            async def mediainfo_btn():
+                link_info = graph.result(f"{key}:mediainfo")
                 if link_info:
                     btn.append(
                         [
@@ -118,36 +164,94 @@ class Executors:
                         ]
                     )
                     await msg.edit(buttons=btn)
-                _hash = secrets.token_hex(nbytes=7)
-                ss_path, sp_path = await self.tools.gen_ss_sam(_hash, self.output_file)
-                if ss_path and sp_path:
-                    ss = await self.bot.send_message(
-                        Var.CLOUD_CHANNEL,
-                        file=glob(f"{ss_path}/*") or ["assest/poster_not_found.jpg"],
-                    )
-                    sp = await self.bot.send_message(
-                        Var.CLOUD_CHANNEL,
-                        file=sp_path,
-                        thumb="thumb.jpg",
-                        force_document=True,
-                    )
-                    await self.db.store_items(_hash, [[i.id for i in ss], [sp.id]])
-                    btn.append(
-                        [
-                            Button.url(
-                                "📺 Sample & ScreenShots",
-                                url=f"https://t.me/{((await self.bot.get_me()).username)}?start={_hash}",
-                            )
-                        ]
-                    )
-                    await msg.edit(buttons=btn)
-                    await self.reporter.all_done()
-                    try:
-                        shutil.rmtree(_hash)
-                        os.remove(sp_path)
-                        os.remove(self.input_file)
-                        os.remove(self.output_file)
-                    except BaseException:
-                        LOGS.error(str(format_exc()))
+
+            async def screenshots():
+                if premade:
+                    return _hash
+                ss_path = await self.tools.gen_ss(_hash, self.output_file)
+                if not ss_path:
+                    raise ValueError("Unable To Generate Screen Shots!")
+                return ss_path
+
+            async def sample():
+                if self.sample_path and os.path.exists(self.sample_path):
+                    if os.path.getsize(self.sample_path):
+                        return self.sample_path
+                sp_path = await self.tools.gen_sample(self.output_file)
+                if not sp_path:
+                    raise ValueError("Unable To Generate Sample!")
+                return sp_path
+
+            async def upload_ss():
+                return await self.bot.send_message(
+                    Var.CLOUD_CHANNEL,
+                    file=sorted(glob(f"{graph.result(f'{key}:screenshots')}/*"))
+                    or ["assest/poster_not_found.jpg"],
+                )
+
+            async def upload_sample():
+                return await self.bot.send_message(
+                    Var.CLOUD_CHANNEL,
+                    file=graph.result(f"{key}:sample"),
+                    thumb="thumb.jpg",
+                    force_document=True,
+                )
+
+            async def store():
+                ss = graph.result(f"{key}:upload_ss")
+                sp = graph.result(f"{key}:upload_sample")
+                await self.db.store_items(_hash, [[i.id for i in ss], [sp.id]])
+
+            async def sample_btn():
+                btn.append(
+                    [
+                        Button.url(
+                            "📺 Sample & ScreenShots",
+                            url=f"https://t.me/{((await self.bot.get_me()).username)}?start={_hash}",
+                        )
+                    ]
+                )
+                await msg.edit(buttons=btn)
+
+            async def cleanup():
+                await self.reporter.all_done()
+                try:
+                    shutil.rmtree(_hash)
+                    for path in (
+                        graph.result(f"{key}:sample"),
+                        self.input_file,
+                        self.output_file,
+                    ):
+                        # ladder rungs never had an input file of their own
+                        if path and os.path.exists(path):
+                            os.remove(path)
+                except BaseException:
+                    LOGS.error(str(format_exc()))
+
+            steps = [
+                ("mediainfo", mediainfo, []),
+                ("mediainfo_btn", mediainfo_btn, ["mediainfo"]),
+                ("screenshots", screenshots, []),
+                ("sample", sample, []),
+                ("upload_ss", upload_ss, ["screenshots"]),
+                ("upload_sample", upload_sample, ["sample"]),
+                ("store", store, ["upload_ss", "upload_sample"]),
+                ("sample_btn", sample_btn, ["store", "mediainfo_btn"]),
+                ("cleanup", cleanup, ["sample_btn"]),
+            ]
+            for name, func, deps in steps:
+                deps = [f"{key}:{dep}" for dep in deps]
+                if name == "cleanup":
+                    # hold lets other resolutions (360p from this 480p)
+                    # finish with the source before it is removed
+                    deps += list(hold)
+                graph.add(f"{key}:{name}", func, deps)
+            failed = await graph.join([f"{key}:{name}" for name, _, _ in steps])
+            for task in failed:
+                if task.error:
+                    await self.reporter.report_error(task.error, log=True)
         except BaseException:
             await self.reporter.report_error(str(format_exc()), log=True)
+        finally:
+            if own:
+                graph.close()
@@ -0,0 +1,889 @@
+#    This file is part of the AutoAnime distribution.
+#    Copyright (c) 2025 Kaif_00z
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, version 3.
+#
+#    This program is distributed in the hope that it will be useful, but
+#    WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+#    General Public License for more details.
+#
+# License can be found in <
+# https://github.com/kaif-00z/AutoAnimeBot/blob/main/LICENSE > .
+
+# if you are using this following code then don't forgot to give proper
+# credit to t.me/kAiF_00z (github.com/kaif-00z)
+
+import asyncio
+import os
+import time
+from itertools import count
+from traceback import format_exc
+
+import anitopy
+from telethon import Button
+
+from core.bot import LOGS, Bot, Var
+from core.executors import Executors
+from core.scheduler import Scheduler, SchedulerQueue
+from core.taskgraph import TaskGraph
+from core.worker import RemoteEncoder
+from database import DataBase
+from functions.allocator import allocator
+from functions.info import AnimeInfo
+from functions.tools import Tools
+from libs.ariawarp import PieceStream, Torrent
+from libs.logger import Reporter
+
+RESOLUTIONS = ["360p", "480p", "720p", "1080p"]
+CHECKPOINTS = ["downloaded", "encoded", "uploaded", "post_processed"]
+LADDER_SOURCE = "1080p"
+
+
+class Release:
+    def __init__(self, data, poster, configurations):
+        self.uid = data.get("uid")
+        self.data = data
+        self.poster = poster
+        self.configurations = configurations
+        self.buttons = {}
+        self.jobs = []
+        self.graph = None
+        self.lock = asyncio.Lock()
+        self.cost = 0
+        self.priority = 0
+        self.demand = 0
+        # aged from the air date, so a caught up backlog keeps its order
+        self.queued_at = data.get("published")
+
+    @property
+    def finished(self):
+        return all(job.finished for job in self.jobs)
+
+    def to_dict(self):
+        return {
+            "entries": {job.resolution: job.entry for job in self.jobs},
+            "poster": [self.poster.chat_id, self.poster.id],
+            "configurations": self.configurations,
+        }
+
+
+class Job:
+    def __init__(self, release: Release, resolution: str, entry, checkpoints=None):
+        self.release = release
+        self.resolution = resolution
+        self.title = entry["title"]
+        self.link = entry.get("link", "")
+        self.source = entry.get("source")
+        # a rung encoded straight from the ladder source, never downloaded
+        self.ladder = entry.get("ladder", False)
+        self.size = entry.get("size") or 0
+        self.show = anitopy.parse(self.title).get("anime_title")
+        self.filename = f"downloads/{self.title}"
+        self.checkpoints = checkpoints or {}
+        self.reporter = None
+        self.executor = None
+        self.finished = False
+
+    @property
+    def id(self):
+        return f"{self.release.uid}:{self.resolution}"
+
+    @property
+    def index(self):
+        return RESOLUTIONS.index(self.resolution)
+
+    @property
+    def entry(self):
+        entry = {"title": self.title, "link": self.link, "size": self.size}
+        if self.source:
+            entry["source"] = self.source
+        if self.ladder:
+            entry["ladder"] = True
+        return entry
+
+    @property
+    def stage(self):
+        """Index of the first stage this job still has to go through."""
+        for index, checkpoint in enumerate(CHECKPOINTS):
+            if not self.checkpoints.get(checkpoint):
+                return index
+        return len(CHECKPOINTS)
+
+
+class Stage:
+    def __init__(self, name, handler, on_done, workers=1, queue_size=0):
+        self.name = name
+        self.handler = handler
+        self.on_done = on_done
+        self.workers = max(1, workers)
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.active = 0
+        self.next = None
+        self.tasks = []
+        self.idle = set()
+        self.draining = False
+
+    def start(self):
+        while len(self.tasks) < self.workers:
+            self.tasks.append(asyncio.ensure_future(self.worker()))
+
+    def resize(self, workers):
+        self.workers = max(1, workers)
+        if self.tasks:
+            self.start()
+        # idle workers retire right away, busy ones after their job
+        for task in list(self.idle)[: len(self.tasks) - self.workers]:
+            task.cancel()
+
+    async def worker(self):
+        task = asyncio.current_task()
+        while True:
+            if len(self.tasks) > self.workers:
+                self.tasks.remove(task)
+                return
+            self.idle.add(task)
+            try:
+                job = await self.queue.get()
+            except asyncio.CancelledError:
+                self.tasks.remove(task)
+                return
+            finally:
+                self.idle.discard(task)
+            if self.draining:
+                # left for Pipeline.resume() after the restart
+                self.queue.task_done()
+                continue
+            self.active += 1
+            succ = False
+            try:
+                succ = await self.handler(job)
+            except Exception:
+                LOGS.error(str(format_exc()))
+            finally:
+                self.active -= 1
+                self.queue.task_done()
+            if self.draining:
+                continue
+            if succ and self.next:
+                # blocks while the next stage is full, which is what
+                # pushes back on the stages in front of it
+                await self.next.queue.put(job)
+            else:
+                await self.on_done(job)
+
+    def status(self):
+        return f"{self.active}/{self.workers} busy, {self.queue.qsize()}/{self.queue.maxsize or '∞'} queued"
+
+
+class Pipeline:
+    def __init__(self, bot: Bot, dB: DataBase, torrent: Torrent):
+        self.bot = bot
+        self.db = dB
+        self.torrent = torrent
+        self.tools = Tools()
+        self.scheduler = Scheduler(dB)
+        self.backlog = SchedulerQueue(self.scheduler, Var.SCHEDULER_BACKLOG)
+        self.releases = {}
+        # claimed by us, not yet in releases while prepare() runs
+        self.preparing = set()
+        self.started = False
+        self.draining = False
+        self.catching_up = False
+        self.concurrency = Var.RESOLUTION_CONCURRENCY
+        self.inline_active = 0
+        self.inline_tasks = set()
+        self.workers = [
+            Var.DOWNLOAD_WORKERS,
+            Var.ENCODE_WORKERS,
+            Var.UPLOAD_WORKERS,
+            Var.POST_WORKERS,
+        ]
+        self.stages = [
+            Stage(
+                "download",
+                self.download,
+                self.finish,
+                Var.DOWNLOAD_WORKERS,
+                Var.PIPELINE_QUEUE_SIZE,
+            ),
+            Stage(
+                "encode",
+                self.encode,
+                self.finish,
+                Var.ENCODE_WORKERS,
+                Var.PIPELINE_QUEUE_SIZE,
+            ),
+            Stage(
+                "upload",
+                self.upload,
+                self.finish,
+                Var.UPLOAD_WORKERS,
+                Var.PIPELINE_QUEUE_SIZE,
+            ),
+            Stage(
+                "post-process",
+                self.post_process,
+                self.finish,
+                Var.POST_WORKERS,
+                Var.PIPELINE_QUEUE_SIZE,
+            ),
+        ]
+        for stage, _next in zip(self.stages, self.stages[1:]):
+            stage.next = _next
+        self.handlers = [stage.handler for stage in self.stages]
+        self.share_cores()
+
+    def start(self):
+        if self.started:
+            return
+        self.started = True
+        for stage in self.stages:
+            stage.start()
+        asyncio.ensure_future(self.dispatch())
+
+    def boost(self, on=True):
+        """Scale every stage by CATCHUP_FACTOR while working off a backlog."""
+        self.catching_up = on
+        factor = max(1, Var.CATCHUP_FACTOR) if on else 1
+        for stage, workers in zip(self.stages, self.workers):
+            stage.resize(workers * factor)
+        self.concurrency = Var.RESOLUTION_CONCURRENCY * factor
+        self.share_cores()
+
+    def share_cores(self):
+        # the allocator splits the cores by the encodes that run at once,
+        # which catch-up boosting changes
+        if Var.PIPELINE_MODE:
+            allocator.encodes = self.stages[1].workers
+        elif self.catching_up:
+            # catch_up() runs CATCHUP_FACTOR releases side by side
+            allocator.encodes = self.concurrency * max(1, Var.CATCHUP_FACTOR)
+        else:
+            allocator.encodes = self.concurrency
+
+    def is_processing(self, uid):
+        return uid in self.releases
+
+    @property
+    def busy(self):
+        return sum(stage.active for stage in self.stages) + self.inline_active
+
+    def status(self):
+        text = "**📊 Pipeline Status**\n\n"
+        text += f"**Backlog [{self.scheduler.policy.upper()}]:** `{self.backlog.qsize()}/{self.backlog.maxsize}`\n"
+        text += self.backlog.status()
+        for stage in self.stages:
+            text += f"**{stage.name.title()}:** `{stage.status()}`\n"
+        text += f"\n**Releases In Flight:** `{len(self.releases)}`"
+        if not Var.PIPELINE_MODE:
+            text += f"\n**Running Inline:** `{self.inline_active}`"
+        if self.catching_up:
+            text += "\n\n`Catching Up On Missed Releases`"
+        if self.draining:
+            text += "\n\n`Draining, New Releases Are On Hold`"
+        return text
+
+    async def drain(self, timeout, progress=None):
+        """Stop taking new work and wait for the running stages to finish."""
+        self.draining = True
+        for stage in self.stages:
+            stage.draining = True
+        deadline = time.time() + timeout
+        while self.busy and time.time() < deadline:
+            if progress:
+                try:
+                    await progress(
+                        f"**♻️ Draining Before Restart**\n\n{self.status()}\n\n**Time Left:** `{self.tools.ts(int(deadline - time.time()) * 1000)}`"
+                    )
+                except BaseException:
+                    pass
+            await asyncio.sleep(5)
+        if self.busy:
+            LOGS.warning(f"Drain Deadline Reached With {self.busy} Task(s) Running")
+            # their processes run in sessions of their own and would outlive
+            # the exec, cancelling lets the supervisor kill them first
+            tasks = [task for stage in self.stages for task in stage.tasks]
+            tasks += list(self.inline_tasks)
+            tasks += [
+                task.task
+                for graph in TaskGraph.graphs
+                for task in graph.tasks.values()
+                if task.task
+            ]
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                await asyncio.wait(tasks, timeout=30)
+        # every release still queued is already checkpointed in releaseJobs,
+        # so Pipeline.resume() picks it up after the restart
+        LOGS.info(f"Drained, {len(self.releases)} Release(s) Saved For Resume")
+        if self.torrent.aria2:
+            # it outlives the bot otherwise, aria2's session resumes the rest
+            await self.torrent.aria2.shutdown()
+
+    async def prepare(self, data):
+        entries = [
+            (
+                res,
+                {
+                    "title": data[res]["title"],
+                    "link": data[res].get("link", ""),
+                    "size": self.scheduler.parse_size(data[res].get("subsplease_size")),
+                },
+            )
+            for res in RESOLUTIONS
+            if data.get(res)
+        ]
+        if Var.LADDER_MODE and data.get(LADDER_SOURCE):
+            # download the top release only, the rest is scaled from it
+            entries = [entry for entry in entries if entry[0] == LADDER_SOURCE]
+            entries += [
+                (
+                    res,
+                    {
+                        "title": data[LADDER_SOURCE]["title"].replace(
+                            LADDER_SOURCE, res
+                        ),
+                        "link": "",
+                        "source": LADDER_SOURCE,
+                        "ladder": True,
+                    },
+                )
+                for res in RESOLUTIONS
+                if res != LADDER_SOURCE
+            ]
+        elif data.get("480p") and not data.get("360p"):
+            # 360p is scaled down from the finished 480p download
+            entries.append(
+                (
+                    "360p",
+                    {
+                        "title": data["480p"]["title"].replace("480p", "360p"),
+                        "link": "",
+                        "source": "480p",
+                    },
+                )
+            )
+        anime_info = AnimeInfo(entries[0][1]["title"])
+        poster = await self.tools._poster(self.bot, anime_info)
+
+        if await self.db.is_separate_channel_upload():
+            chat_info = await self.tools.get_chat_info(self.bot, anime_info, self.db)
+            await poster.edit(
+                buttons=[
+                    [
+                        Button.url(
+                            f"EPISODE {anime_info.data.get('episode_number', '')}".strip(),
+                            url=chat_info["invite_link"],
+                        )
+                    ]
+                ]
+            )
+            poster = await self.tools._poster(
+                self.bot, anime_info, chat_info["chat_id"]
+            )
+
+        release = Release(
+            data,
+            poster,
+            {
+                "original_upload": await self.db.is_original_upload(),
+                "button_upload": await self.db.is_button_upload(),
+            },
+        )
+        release.jobs = [Job(release, res, entry) for res, entry in entries]
+        self.plan(release)
+        await self.db.add_release_job(
+            release.uid,
+            release.to_dict(),
+            [(job.id, job.resolution) for job in release.jobs],
+        )
+        self.releases[release.uid] = release
+        return release
+
+    async def restore(self, doc):
+        _data = doc["data"]
+        chat_id, msg_id = _data["poster"]
+        poster = await self.bot.get_messages(chat_id, ids=msg_id)
+        release = Release(
+            {"uid": doc["_id"], **_data["entries"]}, poster, _data["configurations"]
+        )
+        saved = await self.db.get_resolution_jobs(release.uid)
+        for res, entry in _data["entries"].items():
+            job = Job(release, res, entry, (saved.get(res) or {}).get("checkpoints"))
+            job.finished = job.stage == len(CHECKPOINTS)
+            release.jobs.append(job)
+            if job.checkpoints.get("uploaded") and release.configurations.get(
+                "button_upload"
+            ):
+                await self.attach(job)
+                release.buttons[job.index] = await job.executor.button()
+        self.plan(release)
+        self.releases[release.uid] = release
+        return release
+
+    def plan(self, release: Release):
+        release.graph = TaskGraph(release.jobs[0].title)
+        rungs = [job for job in release.jobs if job.ladder]
+        if rungs and not all(
+            job.checkpoints.get("encoded") for job in release.jobs
+        ):
+            source = next(i for i in release.jobs if i.resolution == LADDER_SOURCE)
+            if source.checkpoints.get("downloaded"):
+                release.graph.resolve(
+                    f"{LADDER_SOURCE}:downloaded", os.path.exists(source.filename)
+                )
+            release.graph.add(
+                "ladder",
+                lambda: self.ladder(release),
+                [f"{LADDER_SOURCE}:downloaded"],
+                limited=False,
+            )
+        for job in release.jobs:
+            if not job.source or job.ladder or job.checkpoints.get("downloaded"):
+                continue
+            source = next(i for i in release.jobs if i.resolution == job.source)
+            if source.checkpoints.get("downloaded"):
+                # resumed past its download stage, so nothing else resolves it
+                release.graph.resolve(
+                    f"{source.resolution}:downloaded",
+                    os.path.exists(source.filename),
+                )
+            release.graph.add(
+                f"{job.resolution}:derive",
+                lambda job=job, source=source: self.tools.generate_360p(
+                    source.filename, job.filename
+                ),
+                [f"{source.resolution}:downloaded"],
+                limited=False,
+            )
+
+    async def claim(self, uid):
+        if not await self.db.claim_release(uid, Var.INSTANCE_ID, Var.LEASE_TTL):
+            return False
+        self.preparing.add(uid)
+        if await self.db.is_anime_uploaded(uid):
+            # finished by another instance after our feed fetch
+            self.preparing.discard(uid)
+            await self.db.remove_release_job(uid)
+            return False
+        return True
+
+    async def claim_jobs(self, release: Release):
+        """Lease every unfinished job, or give the release up to its holder."""
+        for job in release.jobs:
+            if job.finished:
+                continue
+            if not await self.db.claim_resolution_job(
+                job.id, Var.INSTANCE_ID, Var.LEASE_TTL
+            ):
+                LOGS.warning(f"{job.id} Is Leased By Another Instance, Leaving It")
+                self.releases.pop(release.uid, None)
+                release.graph.close()
+                return False
+        return True
+
+    async def resume(self):
+        """Pick up the releases a crash or restart left half done."""
+        await self.adopt()
+        asyncio.ensure_future(self.keep_leases())
+
+    async def adopt(self):
+        """Take over releases whose lease is ours, expired or missing."""
+        for doc in await self.db.get_release_jobs():
+            if doc["_id"] in self.releases or doc["_id"] in self.preparing:
+                continue
+            if not await self.db.claim_release(
+                doc["_id"], Var.INSTANCE_ID, Var.LEASE_TTL
+            ):
+                continue
+            if doc["_id"] in self.releases or doc["_id"] in self.preparing:
+                # claimed by submit() or run() while we waited
+                continue
+            if not doc.get("data"):
+                # claimed but never prepared, nothing to resume
+                await self.db.remove_release_job(doc["_id"])
+                continue
+            try:
+                release = await self.restore(doc)
+            except BaseException:
+                LOGS.error(str(format_exc()))
+                continue
+            LOGS.info(f"Resuming {len(release.jobs)} Job(s) Of {release.uid}")
+            if release.finished:
+                await self.finish(release.jobs[0])
+            elif Var.PIPELINE_MODE:
+                asyncio.ensure_future(self.enqueue(release))
+            else:
+                asyncio.ensure_future(self.process(release))
+
+    async def keep_leases(self):
+        """Heartbeat our leases and adopt the ones dead instances left."""
+        for tick in count(1):
+            await asyncio.sleep(max(1, Var.LEASE_TTL // 3))
+            try:
+                await self.db.renew_leases(
+                    list(self.releases) + list(self.preparing),
+                    [
+                        job.id
+                        for release in self.releases.values()
+                        for job in release.jobs
+                        if not job.finished
+                    ],
+                    Var.INSTANCE_ID,
+                    Var.LEASE_TTL,
+                )
+                if tick % 3 == 0 and not self.draining:
+                    await self.adopt()
+            except BaseException:
+                LOGS.error(str(format_exc()))
+
+    async def attach(self, job: Job):
+        if not job.reporter:
+            job.reporter = Reporter(self.bot, job.title)
+            await job.reporter.alert_new_file_founded()
+        if not job.executor:
+            job.executor = Executors(
+                self.bot,
+                self.db,
+                job.release.configurations,
+                job.filename,
+                AnimeInfo(job.title),
+                job.reporter,
+            )
+            if Var.REMOTE_ENCODE:
+                job.executor.encoder = RemoteEncoder(self.db, job)
+            job.executor.output_file = job.checkpoints.get("encoded")
+            job.executor.msg_id = job.checkpoints.get("uploaded")
+
+    async def ladder(self, release: Release):
+        """Encodes the source and every rung scaled from it in one ffmpeg."""
+        source = next(i for i in release.jobs if i.resolution == LADDER_SOURCE)
+        jobs = [source] + [i for i in release.jobs if i.ladder]
+        outputs = {}
+        for job in jobs:
+            await self.attach(job)
+            rename = await job.executor.anime_info.rename(
+                release.configurations.get("original_upload")
+            )
+            job.executor.output_file = f"encode/{rename}"
+            outputs[int(job.resolution[:-1])] = job.executor.output_file
+        for job in jobs[1:]:
+            await job.reporter.started_compressing()
+        tools = Tools()
+        started = time.time()
+        succ, out = await tools.ladder(
+            source.filename, outputs, await source.reporter.started_compressing()
+        )
+        if not succ:
+            raise ValueError(out)
+        source.reporter.msg = out
+        for job in jobs:
+            await self.checkpoint(job, "encoded", job.executor.output_file)
+        await self.scheduler.record_encode(
+            source,
+            tools.frames,
+            time.time() - started,
+            os.path.getsize(source.filename),
+            os.path.getsize(source.executor.output_file),
+            tools.stats,
+        )
+
+    async def checkpoint(self, job: Job, stage, value=True):
+        job.checkpoints[stage] = value
+        await self.db.checkpoint_job(job.id, stage, value)
+
+    async def _failed(self, job, error):
+        await job.reporter.report_error(error, log=True)
+        await job.reporter.msg.delete()
+        return False
+
+    async def download(self, job: Job):
+        try:
+            await self.attach(job)
+            if job.checkpoints.get("downloaded") and os.path.exists(job.filename):
+                job.release.graph.resolve(f"{job.resolution}:downloaded")
+                return True
+            if job.ladder:
+                # its encode stage waits for the ladder source instead
+                await self.checkpoint(job, "downloaded")
+                return True
+
+            ok = True
+            if job.source:
+                ok = await job.release.graph.wait(f"{job.resolution}:derive")
+            elif job.link.startswith("magnet:") and self.streams(job):
+                return await self.stream(job)
+            elif job.link.startswith("magnet:"):  # ✅ Handle Torrent
+                ok = await self.torrent.race(
+                    job.link,
+                    "./downloads/",
+                    job.title,
+                    job.size,
+                    job.reporter.downloading,
+                )
+            return await self.downloaded(job, ok)
+        except BaseException:
+            job.release.graph.resolve(f"{job.resolution}:downloaded", False)
+            if not job.reporter or not job.reporter.msg:
+                LOGS.error(str(format_exc()))
+                return False
+            return await self._failed(job, str(format_exc()))
+
+    async def downloaded(self, job: Job, ok=True):
+        if not ok or not os.path.exists(job.filename):
+            # a stalled or killed download leaves its preallocated file behind
+            for path in (job.filename, f"{job.filename}.aria2"):
+                if os.path.exists(path):
+                    os.remove(path)
+            job.release.graph.resolve(f"{job.resolution}:downloaded", False)
+            return await self._failed(job, "Unable To Download This File!")
+        await self.checkpoint(job, "downloaded")
+        job.release.graph.resolve(f"{job.resolution}:downloaded")
+        return True
+
+    def streams(self, job: Job):
+        return (
+            Var.STREAM_ENCODE
+            and self.torrent.aria2
+            and not Var.REMOTE_ENCODE
+            and not job.executor.is_original
+            # the ladder encodes its source itself
+            and not (
+                "ladder" in job.release.graph.tasks
+                and job.resolution == LADDER_SOURCE
+            )
+        )
+
+    async def stream(self, job: Job):
+        """Downloads job while its encode reads along from a fifo.
+
+        aria2 fetches the pieces in order and ffmpeg blocks on the fifo until
+        the next ones are in, so the encode ends soon after the download.
+        If it fails, the encode stage encodes the finished file as usual.
+        """
+        fifo = f"{job.filename}.fifo"
+        if os.path.exists(fifo):
+            os.remove(fifo)
+        os.mkfifo(fifo)
+        stream = PieceStream(fifo)
+        # the magnet with TRACKERS, mirrors aren't raced while streaming
+        link = self.torrent.sources(job.link, job.title)[0]
+        download = asyncio.ensure_future(
+            self.torrent.download_magnet(link, "./downloads/", stream=stream)
+        )
+        pump = asyncio.ensure_future(stream.pump())
+        encode = None
+        try:
+            ready = asyncio.ensure_future(stream.ready.wait())
+            await asyncio.wait({download, ready}, return_when=asyncio.FIRST_COMPLETED)
+            ready.cancel()
+            if stream.ready.is_set() and not stream.failed:
+                job.executor.stream = fifo
+                encode = asyncio.ensure_future(job.executor.encode())
+            if not await self.downloaded(job, await download):
+                return False
+            if not encode:
+                return True
+            succ, out = await encode
+            if not succ:
+                LOGS.warning(f"Streamed Encode Failed, Encoding Again: {out}")
+                return True
+            # not recorded with the scheduler, its time is mostly the download
+            await self.checkpoint(job, "encoded", job.executor.output_file)
+            return True
+        finally:
+            job.executor.stream = None
+            # ffmpeg goes first, so a write blocked on the fifo fails
+            for task in (encode, pump, download):
+                if task:
+                    task.cancel()
+            os.remove(fifo)
+
+    async def encode(self, job: Job):
+        try:
+            await self.attach(job)
+            if job.checkpoints.get("encoded") and os.path.exists(
+                job.checkpoints["encoded"]
+            ):
+                return True
+            if "ladder" in job.release.graph.tasks and (
+                job.ladder or job.resolution == LADDER_SOURCE
+            ):
+                if not await job.release.graph.wait("ladder"):
+                    return await self._failed(job, "Unable To Encode The Ladder!")
+                return True
+            if job.executor.is_original:
+                # renaming moves the file away from under the derive
+                for name in self.derives(job):
+                    await job.release.graph.wait(name)
+            started = time.time()
+            succ, out = await job.executor.encode()
+            if not succ:
+                return await self._failed(job, out)
+            await self.checkpoint(job, "encoded", job.executor.output_file)
+            await self.scheduler.record_encode(
+                job,
+                job.executor.encoder.frames,
+                time.time() - started,
+                os.path.getsize(job.filename) if os.path.exists(job.filename) else 0,
+                os.path.getsize(job.executor.output_file),
+                job.executor.encoder.stats,
+            )
+            return True
+        except BaseException:
+            return await self._failed(job, str(format_exc()))
+
+    async def upload(self, job: Job):
+        try:
+            await self.attach(job)
+            if job.checkpoints.get("uploaded"):
+                return True
+            started = time.time()
+            succ, _btn = await job.executor.upload()
+            if not succ:
+                return await self._failed(job, _btn)
+            await self.checkpoint(job, "uploaded", job.executor.msg_id)
+            await self.scheduler.record_upload(
+                job, os.path.getsize(job.executor.output_file), time.time() - started
+            )
+            if _btn:
+                await self.db.add_file_show(job.executor.msg_id, job.show)
+            if _btn and job.release.poster:
+                release = job.release
+                # keep the button row in resolution order no matter which
+                # upload finishes first
+                async with release.lock:
+                    release.buttons[job.index] = _btn
+                    await release.poster.edit(
+                        buttons=self.tools.button_rows(
+                            [release.buttons[k] for k in sorted(release.buttons)]
+                        )
+                    )
+            return True
+        except BaseException:
+            return await self._failed(job, str(format_exc()))
+
+    async def post_process(self, job: Job):
+        await self.attach(job)
+        await job.executor.further_work(job.release.graph, self.derives(job))
+        await self.checkpoint(job, "post_processed")
+        return True
+
+    def derives(self, job: Job):
+        """Derive tasks reading job's download."""
+        return [
+            f"{i.resolution}:derive"
+            for i in job.release.jobs
+            if i.source == job.resolution
+            and f"{i.resolution}:derive" in job.release.graph.tasks
+        ]
+
+    async def finish(self, job: Job):
+        job.finished = True
+        release = job.release
+        if release.finished and self.releases.pop(release.uid, None):
+            release.graph.close()
+            await self.db.add_anime(release.uid)
+            await self.db.remove_release_job(release.uid)
+
+    async def enqueue(self, release: Release):
+        self.start()
+        if not await self.claim_jobs(release):
+            return
+        for job in release.jobs:
+            if job.finished:
+                continue
+            # resumed jobs go straight to the first stage they haven't
+            # checkpointed yet
+            await self.stages[job.stage].queue.put(job)
+
+    async def process(self, release: Release):
+        if not await self.claim_jobs(release):
+            return
+        semaphore = asyncio.Semaphore(max(1, self.concurrency))
+
+        async def post_process(job):
+            self.inline_active += 1
+            try:
+                await self.post_process(job)
+                await self.finish(job)
+            finally:
+                self.inline_active -= 1
+
+        async def process(job):
+            async with semaphore:
+                for handler in self.handlers[job.stage : -1]:
+                    if self.draining:
+                        return
+                    self.inline_active += 1
+                    try:
+                        succ = await handler(job)
+                    finally:
+                        self.inline_active -= 1
+                    if not succ:
+                        break
+                else:
+                    if not self.draining:
+                        self.track(asyncio.ensure_future(post_process(job)))
+                    return
+                if not self.draining:
+                    # a failure the drain caused, left for resume()
+                    await self.finish(job)
+
+        await asyncio.gather(
+            *[
+                self.track(asyncio.ensure_future(process(job)))
+                for job in release.jobs
+                if not job.finished
+            ],
+            return_exceptions=True,
+        )
+
+    def track(self, task):
+        self.inline_tasks.add(task)
+        task.add_done_callback(self.inline_tasks.discard)
+        return task
+
+    async def dispatch(self):
+        """Move the release the scheduler ranks first into the download stage."""
+        while True:
+            # choose only once there is room, so late arrivals still compete
+            while self.draining or self.stages[0].queue.full():
+                await asyncio.sleep(1)
+            release = await self.backlog.get()
+            await self.enqueue(release)
+
+    async def submit(self, data):
+        """Queue a release in the scheduler backlog, waiting while it is full."""
+        self.start()
+        if not await self.claim(data.get("uid")):
+            return
+        try:
+            release = await self.prepare(data)
+        except BaseException:
+            LOGS.error(str(format_exc()))
+            return await self.db.add_anime(data.get("uid"))
+        finally:
+            self.preparing.discard(data.get("uid"))
+        try:
+            await self.scheduler.estimate(release)
+        except BaseException:
+            LOGS.error(str(format_exc()))
+        await self.backlog.put(release)
+
+    async def run(self, data):
+        """Process a release inline, one resolution per semaphore slot."""
+        if not await self.claim(data.get("uid")):
+            return
+        try:
+            release = await self.prepare(data)
+        except BaseException:
+            LOGS.error(str(format_exc()))
+            return await self.db.add_anime(data.get("uid"))
+        finally:
+            self.preparing.discard(data.get("uid"))
+        await self.process(release)
@@ -0,0 +1,150 @@
+#    This file is part of the AutoAnime distribution.
+#    Copyright (c) 2025 Kaif_00z
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, version 3.
+#
+#    This program is distributed in the hope that it will be useful, but
+#    WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+#    General Public License for more details.
+#
+# License can be found in <
+# https://github.com/kaif-00z/AutoAnimeBot/blob/main/LICENSE > .
+
+# if you are using this following code then don't forgot to give proper
+# credit to t.me/kAiF_00z (github.com/kaif-00z)
+
+import asyncio
+import re
+import time
+from traceback import format_exc
+
+from core.bot import LOGS, Var
+from database import DataBase
+
+# used until a show has history of its own
+DEFAULT_FPS = 40
+DEFAULT_FRAMES = 24 * 60 * 24000 / 1001
+DEFAULT_UPLOAD_SPEED = 5 * 1024 * 1024
+DEFAULT_RATIO = 0.5
+
+
+class Scheduler:
+    """Orders queued releases by SJF, per-show priority or subscriber demand.
+
+    Every policy is aged by SCHEDULER_AGING, the longer a release waits the
+    closer its key gets to the front, so nothing starves.
+    """
+
+    def __init__(self, dB: DataBase):
+        self.db = dB
+        self.policy = Var.SCHEDULER_POLICY.lower()
+        self.priorities = {}
+        for item in Var.SHOW_PRIORITY.split("|"):
+            if ":" in item:
+                show, value = item.rsplit(":", 1)
+                self.priorities[show.strip().lower()] = int(value)
+
+    def parse_size(self, size):
+        # SubsPlease sends it as "1.37 GiB"
+        match = re.match(r"([\d.]+)\s*([KMGT]?)i?B", str(size or ""), re.I)
+        if not match:
+            return 0
+        power = "BKMGT".index(match.group(2).upper() or "B")
+        return int(float(match.group(1)) * 1024**power)
+
+    async def estimate_job(self, job):
+        stats = await self.db.get_show_stats(job.show, job.resolution)
+        size = job.size or stats.get("size") or 0
+        frames = (
+            size / stats["bytes_per_frame"]
+            if size and stats.get("bytes_per_frame")
+            else stats.get("frames") or DEFAULT_FRAMES
+        )
+        encode = frames / (stats.get("encode_fps") or DEFAULT_FPS)
+        upload = (size or 0) * (stats.get("ratio") or DEFAULT_RATIO)
+        upload /= stats.get("upload_speed") or DEFAULT_UPLOAD_SPEED
+        return encode + upload
+
+    async def estimate(self, release):
+        release.cost = 0
+        for job in release.jobs:
+            job.cost = await self.estimate_job(job)
+            release.cost += job.cost
+        show = release.jobs[0].show
+        release.priority = self.priorities.get((show or "").lower(), 0)
+        release.demand = (await self.db.get_show_stats(show)).get("demand", 0)
+
+    def key(self, release):
+        age = 1 + (time.time() - release.queued_at) / max(1, Var.SCHEDULER_AGING)
+        if self.policy == "sjf":
+            return release.cost / age
+        if self.policy == "priority":
+            # additive, so waiting lifts a negative priority too; every
+            # SCHEDULER_AGING seconds of waiting is worth one priority point
+            return -release.priority - age
+        if self.policy == "demand":
+            return -(1 + release.demand) * age
+        return release.queued_at
+
+    async def _ema(self, show, resolution, values):
+        try:
+            stats = await self.db.get_show_stats(show, resolution)
+            for key, value in values.items():
+                old = stats.get(key)
+                stats[key] = value if old is None else old * 0.7 + value * 0.3
+            stats.pop("_id", None)
+            await self.db.update_show_stats(show, resolution, stats)
+        except BaseException:
+            LOGS.error(str(format_exc()))
+
+    async def record_encode(
+        self, job, frames, seconds, in_size, out_size, stats=None
+    ):
+        if not frames or not seconds:
+            return
+        values = {"encode_fps": frames / seconds, "frames": frames}
+        if stats:
+            values["cpu_seconds"] = stats.cpu
+            values["max_rss"] = stats.max_rss
+            if stats.speed:
+                values["encode_speed"] = stats.speed
+        if in_size:
+            values["size"] = in_size
+            values["bytes_per_frame"] = in_size / frames
+            values["ratio"] = out_size / in_size
+        await self._ema(job.show, job.resolution, values)
+
+    async def record_upload(self, job, size, seconds):
+        if size and seconds:
+            await self._ema(
+                job.show, job.resolution, {"upload_speed": size / seconds}
+            )
+
+
+class SchedulerQueue(asyncio.Queue):
+    """asyncio.Queue that hands out the release with the lowest scheduler key."""
+
+    def __init__(self, scheduler: Scheduler, maxsize=0):
+        self.scheduler = scheduler
+        super().__init__(maxsize)
+
+    def _init(self, maxsize):
+        self._queue = []
+
+    def _put(self, release):
+        release.queued_at = release.queued_at or time.time()
+        self._queue.append(release)
+
+    def _get(self):
+        release = min(self._queue, key=self.scheduler.key)
+        self._queue.remove(release)
+        return release
+
+    def status(self):
+        text = ""
+        for release in sorted(self._queue, key=self.scheduler.key):
+            text += f"`• {release.jobs[0].show} (~{int(release.cost // 60)}m)`\n"
+        return text
@@ -0,0 +1,157 @@
+#    This file is part of the AutoAnime distribution.
+#    Copyright (c) 2025 Kaif_00z
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, version 3.
+#
+#    This program is distributed in the hope that it will be useful, but
+#    WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+#    General Public License for more details.
+#
+# License can be found in <
+# https://github.com/kaif-00z/AutoAnimeBot/blob/main/LICENSE > .
+
+# if you are using this following code then don't forgot to give proper
+# credit to t.me/kAiF_00z (github.com/kaif-00z)
+
+import asyncio
+from contextlib import nullcontext
+from traceback import format_exc
+
+from functions.config import Var
+from libs.logger import LOGS
+
+
+class Task:
+    def __init__(self, name, func=None, deps=()):
+        self.name = name
+        self.func = func
+        self.deps = list(deps)
+        self.limited = True
+        self.state = "pending"
+        self.result = None
+        self.error = None
+        self.task = None
+        self.event = asyncio.Event()
+
+    @property
+    def ok(self):
+        return self.state == "done"
+
+
+class TaskGraph:
+    """Tasks of one episode, each started as soon as its dependencies finish.
+
+    A task without a function is an external event (for example a download
+    finishing in the pipeline) which is completed through resolve().
+    """
+
+    graphs = []
+    _limit = None
+
+    def __init__(self, name):
+        self.name = name
+        self.tasks = {}
+        TaskGraph.graphs.append(self)
+
+    @classmethod
+    def limit(cls):
+        if not cls._limit:
+            cls._limit = asyncio.Semaphore(max(1, Var.POST_TASK_LIMIT))
+        return cls._limit
+
+    def _get(self, name):
+        if name not in self.tasks:
+            self.tasks[name] = Task(name)
+        return self.tasks[name]
+
+    def add(self, name, func, deps=(), limited=True):
+        task = self._get(name)
+        task.func = func
+        task.deps = list(deps)
+        # POST_TASK_LIMIT is for post processing, not the critical path
+        task.limited = limited
+        for dep in task.deps:
+            self._get(dep)
+        task.task = asyncio.ensure_future(self._run(task))
+        return task
+
+    def resolve(self, name, ok=True, result=None):
+        task = self._get(name)
+        task.state = "done" if ok else "failed"
+        task.result = result
+        task.event.set()
+
+    async def _run(self, task: Task):
+        try:
+            for dep in task.deps:
+                await self.tasks[dep].event.wait()
+                if not self.tasks[dep].ok:
+                    task.state = "skipped"
+                    return
+            async with self.limit() if task.limited else nullcontext():
+                task.state = "running"
+                task.result = await task.func()
+            task.state = "done"
+        except asyncio.CancelledError:
+            task.state = "cancelled"
+        except BaseException:
+            task.state = "failed"
+            task.error = str(format_exc())
+            LOGS.error(f"{self.name} [{task.name}] {task.error}")
+        finally:
+            task.event.set()
+
+    async def wait(self, name):
+        task = self._get(name)
+        await task.event.wait()
+        return task.ok
+
+    def result(self, name):
+        return self._get(name).result
+
+    async def join(self, names=None):
+        names = list(names or self.tasks)
+        for name in names:
+            await self._get(name).event.wait()
+        return [self.tasks[name] for name in names if not self.tasks[name].ok]
+
+    def cancel(self):
+        for task in self.tasks.values():
+            if task.task and not task.task.done():
+                task.task.cancel()
+            elif not task.event.is_set():
+                task.state = "cancelled"
+                task.event.set()
+
+    def close(self):
+        self.cancel()
+        if self in TaskGraph.graphs:
+            TaskGraph.graphs.remove(self)
+
+    def counts(self):
+        counts = {}
+        for task in self.tasks.values():
+            counts[task.state] = counts.get(task.state, 0) + 1
+        return counts
+
+    @classmethod
+    def status(cls):
+        text = "**🧩 Episode Tasks**\n\n"
+        if not cls.graphs:
+            return text + "`No Tasks Running`"
+        for graph in cls.graphs:
+            counts = ", ".join(f"{v} {k}" for k, v in graph.counts().items())
+            running = [t.name for t in graph.tasks.values() if t.state == "running"]
+            text += f"**{graph.name}**\n`{counts}`\n"
+            if running:
+                text += f"`▶️ {', '.join(running)}`\n"
+            text += "\n"
+        return text
+
+    @classmethod
+    def cancel_all(cls):
+        for graph in cls.graphs:
+            graph.cancel()
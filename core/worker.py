@@ -0,0 +1,214 @@
+#    This file is part of the AutoAnime distribution.
+#    Copyright (c) 2025 Kaif_00z
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, version 3.
+#
+#    This program is distributed in the hope that it will be useful, but
+#    WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+#    General Public License for more details.
+#
+# License can be found in <
+# https://github.com/kaif-00z/AutoAnimeBot/blob/main/LICENSE > .
+
+# if you are using this following code then don't forgot to give proper
+# credit to t.me/kAiF_00z (github.com/kaif-00z)
+
+import asyncio
+import os
+import shutil
+import socket
+import time
+from traceback import format_exc
+
+from telethon.errors.rpcerrorlist import MessageNotModifiedError
+
+from database import DataBase
+from functions.config import Var
+from functions.tools import Tools
+from libs.ariawarp import Torrent
+from libs.logger import LOGS
+
+
+class RemoteEncoder:
+    """Stands in for Tools in the bot, handing compress() to encode workers.
+
+    A job no live worker holds for REMOTE_CLAIM_TIMEOUT is taken back and
+    encoded here, so a missing or dead worker can't hold the release up.
+    """
+
+    def __init__(self, dB: DataBase, job):
+        self.db = dB
+        self.job = job
+        self.tools = Tools()
+        self.frames = 0
+        self.stats = None
+
+    async def compress(
+        self, dl, out, log_msg, ss_path=None, sample_path=None, stream=None
+    ):
+        if not self.job.link:
+            # derived files only exist on this machine
+            return await self.local(dl, out, log_msg, ss_path, sample_path, stream)
+        await self.db.add_encode_job(
+            self.job.id,
+            {
+                "title": self.job.title,
+                "link": self.job.link,
+                "input": os.path.abspath(dl),
+                "output": os.path.basename(out),
+            },
+        )
+        progress = None
+        started = waiting = time.time()
+        while True:
+            await asyncio.sleep(5)
+            doc = await self.db.get_encode_job(self.job.id)
+            if not doc:
+                return False, "Encode Job Vanished From The Queue!"
+            if doc["state"] == "failed":
+                await self.db.remove_encode_job(self.job.id)
+                return False, doc.get("error") or "Unable To Encode This Video!"
+            if doc["state"] == "done":
+                break
+            now = time.time()
+            if doc["state"] == "running" and doc.get("expires", 0) >= now:
+                waiting = now
+            elif now - waiting > Var.REMOTE_CLAIM_TIMEOUT:
+                # no worker took it, or the one running it died
+                if await self.db.take_encode_job(self.job.id, Var.INSTANCE_ID):
+                    LOGS.warning(f"No Worker For {self.job.id}, Encoding Here")
+                    try:
+                        return await self.local(
+                            dl, out, log_msg, ss_path, sample_path
+                        )
+                    finally:
+                        await self.db.remove_encode_job(self.job.id)
+            if now - started > Var.REMOTE_CLAIM_TIMEOUT + Var.ENCODE_TIMEOUT:
+                await self.db.remove_encode_job(self.job.id)
+                return False, "Remote Encode Timed Out!"
+            if doc.get("progress") and doc["progress"] != progress:
+                progress = doc["progress"]
+                try:
+                    log_msg = await log_msg.edit(
+                        progress + f"\n\n`🖥 {doc.get('owner')}`"
+                    )
+                except MessageNotModifiedError:
+                    pass
+        await self.db.remove_encode_job(self.job.id)
+        if not os.path.exists(doc["output"]):
+            return False, f"Encoded File Not Reachable: {doc['host']}:{doc['output']}"
+        if os.path.abspath(doc["output"]) != os.path.abspath(out):
+            shutil.move(doc["output"], out)
+        self.frames = doc.get("frames") or 0
+        return True, log_msg
+
+    async def local(self, dl, out, log_msg, ss_path, sample_path, stream=None):
+        succ, out = await self.tools.compress(
+            dl, out, log_msg, ss_path, sample_path, stream
+        )
+        self.frames = self.tools.frames
+        self.stats = self.tools.stats
+        return succ, out
+
+
+class EncodeProgress:
+    """Takes the place of the log message, so progress lands in the queue."""
+
+    def __init__(self, worker, job_id):
+        self.worker = worker
+        self.job_id = job_id
+
+    async def edit(self, text):
+        await self.worker.db.update_encode_job(
+            self.job_id, Var.INSTANCE_ID, {"progress": text}, Var.LEASE_TTL
+        )
+        return self
+
+
+class EncodeWorker:
+    """Encode node, claims jobs from the encodeJobs queue and runs them."""
+
+    def __init__(self, dB: DataBase, torrent: Torrent):
+        self.db = dB
+        self.torrent = torrent
+        self.tools = Tools()
+        self.host = socket.gethostname()
+
+    async def run(self):
+        for path in ("downloads/", Var.ENCODE_STORE):
+            if not os.path.isdir(path):
+                os.makedirs(path)
+        LOGS.info(f"Encode Worker {Var.INSTANCE_ID} Waiting For Jobs")
+        while True:
+            try:
+                doc = await self.db.claim_encode_job(Var.INSTANCE_ID, Var.LEASE_TTL)
+            except BaseException:
+                LOGS.error(str(format_exc()))
+                doc = None
+            if not doc:
+                await asyncio.sleep(5)
+                continue
+            heartbeat = asyncio.ensure_future(self.heartbeat(doc["_id"]))
+            try:
+                await self.encode(doc)
+            except BaseException:
+                LOGS.error(str(format_exc()))
+                await self.db.update_encode_job(
+                    doc["_id"],
+                    Var.INSTANCE_ID,
+                    {"state": "failed", "error": str(format_exc())},
+                )
+            finally:
+                heartbeat.cancel()
+
+    async def heartbeat(self, job_id):
+        while True:
+            await asyncio.sleep(max(1, Var.LEASE_TTL // 3))
+            await self.db.update_encode_job(job_id, Var.INSTANCE_ID, {}, Var.LEASE_TTL)
+
+    async def fetch(self, doc):
+        if os.path.exists(doc["input"]):
+            return doc["input"], False
+        if not doc.get("link", "").startswith("magnet:"):
+            return None, False
+        await self.torrent.race(doc["link"], "./downloads/", doc["title"])
+        dl = f"downloads/{doc['title']}"
+        return (dl, True) if os.path.exists(dl) else (None, False)
+
+    async def encode(self, doc):
+        LOGS.info(f"Encoding {doc['_id']}")
+        dl, fetched = await self.fetch(doc)
+        if not dl:
+            await self.db.update_encode_job(
+                doc["_id"],
+                Var.INSTANCE_ID,
+                {"state": "failed", "error": "Unable To Fetch The Source!"},
+            )
+            return
+        out = os.path.abspath(os.path.join(Var.ENCODE_STORE, doc["output"]))
+        started = time.time()
+        succ, _out = await self.tools.compress(
+            dl, out, EncodeProgress(self, doc["_id"])
+        )
+        if fetched:
+            os.remove(dl)
+        if not succ:
+            await self.db.update_encode_job(
+                doc["_id"], Var.INSTANCE_ID, {"state": "failed", "error": _out}
+            )
+            return
+        await self.db.update_encode_job(
+            doc["_id"],
+            Var.INSTANCE_ID,
+            {
+                "state": "done",
+                "host": self.host,
+                "output": out,
+                "frames": self.tools.frames,
+                "seconds": time.time() - started,
+            },
+        )
+        LOGS.info(f"Encoded {doc['_id']} In {int(time.time() - started)}s")
@@ -17,9 +17,12 @@
 # credit to t.me/kAiF_00z (github.com/kaif-00z)
 
 import sys
+import time
 from traceback import format_exc
 
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 
 from functions.config import Var
 from libs.logger import LOGS
@@ -35,6 +38,11 @@ class DataBase:
             self.opts_db = self.client["ONGOINGANIME"]["opts"]
             self.file_store_db = self.client["ONGOINGANIME"]["fileStore"]
             self.broadcast_db = self.client["ONGOINGANIME"]["broadcastInfo"]
+            self.release_db = self.client["ONGOINGANIME"]["releaseJobs"]
+            self.job_db = self.client["ONGOINGANIME"]["resolutionJobs"]
+            self.show_stats_db = self.client["ONGOINGANIME"]["showStats"]
+            self.file_show_db = self.client["ONGOINGANIME"]["fileShows"]
+            self.encode_db = self.client["ONGOINGANIME"]["encodeJobs"]
             LOGS.info("Successfully Connected With MongoDB")
         except Exception as error:
             LOGS.exception(format_exc())
@@ -94,6 +102,10 @@ class DataBase:
             return True
         return False
 
+    async def get_uploaded_anime(self, uids):
+        data = self.file_info_db.find({"_id": {"$in": uids}})
+        return {i["_id"] for i in (await data.to_list(length=None))}
+
     async def add_anime_channel_info(self, title, _data):
         await self.channel_info_db.update_one(
             {"_id": title}, {"$set": {"data": _data}}, upsert=True
@@ -125,3 +137,154 @@ class DataBase:
     async def get_broadcast_user(self):
         data = self.broadcast_db.find()
         return [i["_id"] for i in (await data.to_list(length=None))]
+
+    async def add_release_job(self, uid, _data, jobs):
+        await self.release_db.update_one(
+            {"_id": uid}, {"$set": {"data": _data}}, upsert=True
+        )
+        for job_id, resolution in jobs:
+            await self.job_db.update_one(
+                {"_id": job_id},
+                {
+                    "$set": {"uid": uid, "resolution": resolution},
+                    "$setOnInsert": {"checkpoints": {}},
+                },
+                upsert=True,
+            )
+
+    async def get_release_jobs(self):
+        data = self.release_db.find()
+        return await data.to_list(length=None)
+
+    async def get_resolution_jobs(self, uid):
+        data = self.job_db.find({"uid": uid})
+        return {i["resolution"]: i for i in (await data.to_list(length=None))}
+
+    async def checkpoint_job(self, job_id, stage, value=True):
+        await self.job_db.update_one(
+            {"_id": job_id}, {"$set": {f"checkpoints.{stage}": value}}
+        )
+
+    async def remove_release_job(self, uid):
+        await self.job_db.delete_many({"uid": uid})
+        await self.release_db.delete_one({"_id": uid})
+
+    async def _claim(self, db, _id, owner, ttl, upsert=False):
+        now = time.time()
+        try:
+            data = await db.update_one(
+                {
+                    "_id": _id,
+                    "$or": [
+                        {"lease": {"$exists": False}},
+                        {"lease.owner": owner},
+                        {"lease.expires": {"$lt": now}},
+                    ],
+                },
+                {"$set": {"lease": {"owner": owner, "expires": now + ttl}}},
+                upsert=upsert,
+            )
+        except DuplicateKeyError:
+            # someone else holds a live lease on it
+            return False
+        return bool(data.matched_count or data.upserted_id)
+
+    async def claim_release(self, uid, owner, ttl):
+        return await self._claim(self.release_db, uid, owner, ttl, upsert=True)
+
+    async def claim_resolution_job(self, job_id, owner, ttl):
+        return await self._claim(self.job_db, job_id, owner, ttl)
+
+    async def renew_leases(self, uids, job_ids, owner, ttl):
+        _set = {"$set": {"lease.expires": time.time() + ttl}}
+        await self.release_db.update_many(
+            {"_id": {"$in": uids}, "lease.owner": owner}, _set
+        )
+        await self.job_db.update_many(
+            {"_id": {"$in": job_ids}, "lease.owner": owner}, _set
+        )
+
+    async def get_leased_releases(self, uids):
+        data = self.release_db.find(
+            {"_id": {"$in": uids}, "lease.expires": {"$gte": time.time()}}
+        )
+        return {i["_id"] for i in (await data.to_list(length=None))}
+
+    async def add_encode_job(self, job_id, _data):
+        await self.encode_db.update_one(
+            {"_id": job_id},
+            {
+                "$set": {
+                    **_data,
+                    "state": "queued",
+                    "progress": None,
+                    "created": time.time(),
+                },
+                "$unset": {"owner": "", "expires": "", "error": ""},
+            },
+            upsert=True,
+        )
+
+    async def claim_encode_job(self, owner, ttl):
+        now = time.time()
+        return await self.encode_db.find_one_and_update(
+            {
+                "$or": [
+                    {"state": "queued"},
+                    # the worker running it stopped heartbeating
+                    {"state": "running", "expires": {"$lt": now}},
+                ]
+            },
+            {"$set": {"state": "running", "owner": owner, "expires": now + ttl}},
+            sort=[("created", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def take_encode_job(self, job_id, owner):
+        now = time.time()
+        return await self.encode_db.find_one_and_update(
+            {
+                "_id": job_id,
+                "$or": [
+                    {"state": "queued"},
+                    {"state": "running", "expires": {"$lt": now}},
+                ],
+            },
+            # workers only claim queued or expired jobs, so it stays ours
+            {"$set": {"state": "local", "owner": owner}},
+        )
+
+    async def update_encode_job(self, job_id, owner, _data, ttl=None):
+        if ttl:
+            _data["expires"] = time.time() + ttl
+        data = await self.encode_db.update_one(
+            {"_id": job_id, "owner": owner}, {"$set": _data}
+        )
+        return bool(data.matched_count)
+
+    async def get_encode_job(self, job_id):
+        return await self.encode_db.find_one({"_id": job_id})
+
+    async def remove_encode_job(self, job_id):
+        await self.encode_db.delete_one({"_id": job_id})
+
+    async def get_show_stats(self, show, resolution=None):
+        _id = f"{show} [{resolution}]" if resolution else show
+        data = await self.show_stats_db.find_one({"_id": _id})
+        return data or {}
+
+    async def update_show_stats(self, show, resolution, _data):
+        _id = f"{show} [{resolution}]" if resolution else show
+        await self.show_stats_db.update_one({"_id": _id}, {"$set": _data}, upsert=True)
+
+    async def add_file_show(self, msg_id, show):
+        await self.file_show_db.update_one(
+            {"_id": msg_id}, {"$set": {"show": show}}, upsert=True
+        )
+
+    async def add_file_demand(self, msg_id):
+        data = await self.file_show_db.find_one({"_id": msg_id})
+        if (data or {}).get("show"):
+            await self.show_stats_db.update_one(
+                {"_id": data["show"]}, {"$inc": {"demand": 1}}, upsert=True
+            )
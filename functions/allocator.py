@@ -0,0 +1,118 @@
+#    This file is part of the AutoAnime distribution.
+#    Copyright (c) 2025 Kaif_00z
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, version 3.
+#
+#    This program is distributed in the hope that it will be useful, but
+#    WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+#    General Public License for more details.
+#
+# License can be found in <
+# https://github.com/kaif-00z/AutoAnimeBot/blob/main/LICENSE > .
+
+# if you are using this following code then don't forgot to give proper
+# credit to t.me/kAiF_00z (github.com/kaif-00z)
+
+import asyncio
+import os
+from traceback import format_exc
+
+from functions.config import Var
+from functions.resources import CRITICAL
+from libs.logger import LOGS
+
+
+class Allocation:
+    def __init__(self, threads):
+        self.threads = threads
+        # x265's own frame-threads table, applied to our share of the cores
+        self.frame_threads = next(
+            f for c, f in ((32, 6), (16, 5), (8, 3), (4, 2), (0, 1)) if threads >= c
+        )
+
+    @property
+    def x265_params(self):
+        return f"pools={self.threads}:frame-threads={self.frame_threads}"
+
+
+class CPUAllocator:
+    """Splits the machine's cores between the encodes running at once.
+
+    Encodes can't change their thread count once started, so every new
+    encode gets the free cores divided by the encode slots still unused.
+    Threads of a finished encode go back to the next one that starts.
+    """
+
+    def __init__(self):
+        self.active = []
+        self.lock = asyncio.Lock()
+        # encodes the pipeline runs at once right now, set by it
+        self.encodes = None
+
+    def cores(self):
+        try:
+            with open("/proc/cpuinfo") as file:
+                cores = file.read().count("processor\t:") or os.cpu_count() or 1
+            cores = min(cores, len(CRITICAL.cpus or os.sched_getaffinity(0)))
+        except BaseException:
+            cores = os.cpu_count() or 1
+        try:
+            # container cpu quota, "max 100000" when unlimited
+            with open("/sys/fs/cgroup/cpu.max") as file:
+                quota, period = file.read().split()
+            if quota != "max":
+                cores = min(cores, max(1, int(quota) // int(period)))
+        except BaseException:
+            pass
+        return cores
+
+    def _stat(self):
+        with open("/proc/stat") as file:
+            values = [int(i) for i in file.readline().split()[1:]]
+        # idle + iowait
+        return values[3] + values[4], sum(values)
+
+    async def busy(self, cores):
+        """Cores kept busy by anything other than our own encodes."""
+        try:
+            idle, total = self._stat()
+            await asyncio.sleep(1)
+            _idle, _total = self._stat()
+            used = (1 - (_idle - idle) / max(1, _total - total)) * cores
+        except BaseException:
+            LOGS.error(str(format_exc()))
+            return 0
+        return max(0, round(used - sum(i.threads for i in self.active)))
+
+    def slots(self):
+        if Var.ENCODE_SLOTS:
+            return Var.ENCODE_SLOTS
+        if self.encodes:
+            return max(1, self.encodes)
+        if Var.PIPELINE_MODE:
+            return max(1, Var.ENCODE_WORKERS)
+        return max(1, Var.RESOLUTION_CONCURRENCY)
+
+    async def acquire(self):
+        async with self.lock:
+            cores = self.cores()
+            held = sum(i.threads for i in self.active)
+            free = cores - held - await self.busy(cores)
+            unused = max(1, self.slots() - len(self.active))
+            allocation = Allocation(max(1, free // unused))
+            self.active.append(allocation)
+            LOGS.info(
+                f"Encode Got {allocation.threads}/{cores} Thread(s), "
+                f"{len(self.active)} Encode(s) Running"
+            )
+            return allocation
+
+    def release(self, allocation):
+        if allocation in self.active:
+            self.active.remove(allocation)
+
+
+allocator = CPUAllocator()
@@ -16,6 +16,9 @@
 # if you are using this following code then don't forgot to give proper
 # credit to t.me/kAiF_00z (github.com/kaif-00z)
 
+import os
+import socket
+
 from decouple import config
 
 
@@ -55,7 +58,101 @@ class Var:
     RESTART_EVERDAY = config("RESTART_EVERDAY", default=True, cast=bool)
     LOG_ON_MAIN = config("LOG_ON_MAIN", default=False, cast=bool)
     FORCESUB_CHANNEL_LINK = config("FORCESUB_CHANNEL_LINK", default="", cast=str)
+    RESOLUTION_CONCURRENCY = config("RESOLUTION_CONCURRENCY", default=1, cast=int)
+    ENCODE_SLOTS = config("ENCODE_SLOTS", default=0, cast=int)
+    SINGLE_PASS = config("SINGLE_PASS", default=False, cast=bool)
+    LADDER_MODE = config("LADDER_MODE", default=False, cast=bool)
+    CHUNKED_ENCODE = config("CHUNKED_ENCODE", default=False, cast=bool)
+    CHUNK_THREADS = config("CHUNK_THREADS", default=4, cast=int)
+
+    # Pipeline Configs
+
+    PIPELINE_MODE = config("PIPELINE_MODE", default=False, cast=bool)
+    PIPELINE_QUEUE_SIZE = config("PIPELINE_QUEUE_SIZE", default=4, cast=int)
+    DOWNLOAD_WORKERS = config("DOWNLOAD_WORKERS", default=2, cast=int)
+    ENCODE_WORKERS = config("ENCODE_WORKERS", default=1, cast=int)
+    UPLOAD_WORKERS = config("UPLOAD_WORKERS", default=1, cast=int)
+    POST_WORKERS = config("POST_WORKERS", default=2, cast=int)
+    POST_TASK_LIMIT = config("POST_TASK_LIMIT", default=4, cast=int)
+    DRAIN_TIMEOUT = config("DRAIN_TIMEOUT", default=3600, cast=int)
+
+    # Scheduler Configs
+
+    SCHEDULER_POLICY = config("SCHEDULER_POLICY", default="sjf")
+    SCHEDULER_AGING = config("SCHEDULER_AGING", default=1800, cast=int)
+    SCHEDULER_BACKLOG = config("SCHEDULER_BACKLOG", default=30, cast=int)
+    SHOW_PRIORITY = config("SHOW_PRIORITY", default="")
+
+    # Catch Up Configs
+
+    CATCHUP_THRESHOLD = config("CATCHUP_THRESHOLD", default=3, cast=int)
+    CATCHUP_FACTOR = config("CATCHUP_FACTOR", default=2, cast=int)
+
+    # Multi Instance Configs
+
+    INSTANCE_ID = config(
+        "INSTANCE_ID", default=f"{socket.gethostname()}-{os.getpid()}"
+    )
+    LEASE_TTL = config("LEASE_TTL", default=120, cast=int)
+
+    # Encode Worker Configs
+
+    REMOTE_ENCODE = config("REMOTE_ENCODE", default=False, cast=bool)
+    ENCODE_STORE = config("ENCODE_STORE", default="encode/")
+    REMOTE_CLAIM_TIMEOUT = config("REMOTE_CLAIM_TIMEOUT", default=600, cast=int)
+
+    # Encoder Configs
+
+    ENCODER_PROFILES = config("ENCODER_PROFILES", default="")
+    SAMPLE_PROFILE = config("SAMPLE_PROFILE", default="x265,ultrafast")
+    SAMPLE_MODE = config("SAMPLE_MODE", default="copy")
+    SS_COUNT = config("SS_COUNT", default=10, cast=int)
+    SS_FORMAT = config("SS_FORMAT", default="jpg")
+
+    # Size Targeting Configs
+
+    TARGET_BITRATES = config("TARGET_BITRATES", default="")
+    SIZE_CAPS = config("SIZE_CAPS", default="")
+    PROBE_CRFS = config("PROBE_CRFS", default="22|27|32")
+    CRF_MIN = config("CRF_MIN", default=18, cast=int)
+    CRF_MAX = config("CRF_MAX", default=36, cast=int)
+
+    # Stream Copy Configs
+
+    COPY_BITRATES = config("COPY_BITRATES", default="")
+    COPY_AUDIO = config("COPY_AUDIO", default=False, cast=bool)
+
+    # Aria2 Configs
+
+    ARIA2_RPC = config("ARIA2_RPC", default=False, cast=bool)
+    ARIA2_PORT = config("ARIA2_PORT", default=6800, cast=int)
+    ARIA2_SECRET = config("ARIA2_SECRET", default="")
+    ARIA2_SESSION = config("ARIA2_SESSION", default="aria2.session")
+    ARIA2_DHT = config("ARIA2_DHT", default="dht.dat")
+    ARIA2_MAX_DOWNLOADS = config("ARIA2_MAX_DOWNLOADS", default=4, cast=int)
+    ARIA2_DOWNLOAD_LIMIT = config("ARIA2_DOWNLOAD_LIMIT", default="0")
+    ARIA2_UPLOAD_LIMIT = config("ARIA2_UPLOAD_LIMIT", default="0")
+    STREAM_ENCODE = config("STREAM_ENCODE", default=False, cast=bool)
+
+    # Download Source Configs
+
+    TRACKERS = config("TRACKERS", default="")
+    MIRRORS = config("MIRRORS", default="")
+    RACE_DELAY = config("RACE_DELAY", default=120, cast=int)
+
+    # Process Configs
+
+    PROCESS_TIMEOUT = config("PROCESS_TIMEOUT", default=1800, cast=int)
+    ENCODE_TIMEOUT = config("ENCODE_TIMEOUT", default=14400, cast=int)
+    DOWNLOAD_TIMEOUT = config("DOWNLOAD_TIMEOUT", default=21600, cast=int)
+    STALL_TIMEOUT = config("STALL_TIMEOUT", default=600, cast=int)
+    PROCESS_RETRIES = config("PROCESS_RETRIES", default=2, cast=int)
+    PROCESS_BACKOFF = config("PROCESS_BACKOFF", default=10, cast=int)
 
-    # Dev Configs
+    # Resource Class Configs
 
-    DEV_MODE = config("DEV_MODE", default=False, cast=bool)
+    CRITICAL_CPUS = config("CRITICAL_CPUS", default="")
+    BACKGROUND_CPUS = config("BACKGROUND_CPUS", default="")
+    IO_CPUS = config("IO_CPUS", default="")
+    BACKGROUND_NICE = config("BACKGROUND_NICE", default=19, cast=int)
+    IO_NICE = config("IO_NICE", default=10, cast=int)
@@ -0,0 +1,105 @@
+#    This file is part of the AutoAnime distribution.
+#    Copyright (c) 2025 Kaif_00z
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, version 3.
+#
+#    This program is distributed in the hope that it will be useful, but
+#    WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+#    General Public License for more details.
+#
+# License can be found in <
+# https://github.com/kaif-00z/AutoAnimeBot/blob/main/LICENSE > .
+
+# if you are using this following code then don't forgot to give proper
+# credit to t.me/kAiF_00z (github.com/kaif-00z)
+
+from functions.config import Var
+
+DEFAULT_PROFILE = "x265,ultrafast"
+
+
+class EncoderProfile:
+    """A video encoder with its preset and tune, written as `x265,slow,animation`.
+
+    `args()` gives its ffmpeg options, scoped to output video stream `stream`
+    when given, for outputs that run several encoders.
+    """
+
+    codec = None
+
+    def __init__(self, name, preset, tune=None):
+        self.name = name
+        self.preset = preset
+        self.tune = tune
+
+    def __str__(self):
+        return ",".join(i for i in (self.name, self.preset, self.tune) if i)
+
+    @staticmethod
+    def parse(spec):
+        name, *rest = [i.strip() for i in spec.split(",")]
+        if name not in BACKENDS:
+            raise ValueError(f"Unknown Encoder {name}, Use {', '.join(BACKENDS)}")
+        backend = BACKENDS[name]
+        preset = rest[0] if rest and rest[0] else backend.default_preset
+        return backend(name, preset, rest[1] if len(rest) > 1 else None)
+
+    @staticmethod
+    def for_resolution(res, default=DEFAULT_PROFILE):
+        for item in Var.ENCODER_PROFILES.split("|"):
+            if ":" in item and item.split(":", 1)[0].strip() == res:
+                return EncoderProfile.parse(item.split(":", 1)[1])
+        return EncoderProfile.parse(default)
+
+    def opt(self, name, stream):
+        return name if stream is None else f"{name}:v:{stream}"
+
+    def args(self, crf, allocation=None, stream=None):
+        # the codec option carries its stream type already, `-c:v:0`
+        args = ["-c:v" if stream is None else f"-c:v:{stream}", self.codec]
+        args += [self.opt("-preset", stream), self.preset]
+        args += [self.opt("-crf", stream), str(crf)]
+        return args + self.extra(allocation, stream)
+
+    def extra(self, allocation, stream):
+        return [self.opt("-tune", stream), self.tune] if self.tune else []
+
+
+class X265Profile(EncoderProfile):
+    codec = "libx265"
+    default_preset = "ultrafast"
+
+    def extra(self, allocation, stream):
+        args = super().extra(allocation, stream)
+        if allocation:
+            args += [self.opt("-x265-params", stream), allocation.x265_params]
+        return args
+
+
+class X264Profile(EncoderProfile):
+    codec = "libx264"
+    default_preset = "veryfast"
+
+
+class SVTAV1Profile(EncoderProfile):
+    codec = "libsvtav1"
+    default_preset = "10"
+
+    def args(self, crf, allocation=None, stream=None):
+        # no fractional crf here
+        return super().args(round(float(crf)), allocation, stream)
+
+    def extra(self, allocation, stream):
+        # svt-av1 takes its tune and thread count as encoder params
+        params = [f"tune={self.tune}"] if self.tune else []
+        if allocation:
+            params.append(f"lp={allocation.threads}")
+        if not params:
+            return []
+        return [self.opt("-svtav1-params", stream), ":".join(params)]
+
+
+BACKENDS = {"x265": X265Profile, "x264": X264Profile, "svtav1": SVTAV1Profile}
@@ -0,0 +1,113 @@
+#    This file is part of the AutoAnime distribution.
+#    Copyright (c) 2025 Kaif_00z
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, version 3.
+#
+#    This program is distributed in the hope that it will be useful, but
+#    WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+#    General Public License for more details.
+#
+# License can be found in <
+# https://github.com/kaif-00z/AutoAnimeBot/blob/main/LICENSE > .
+
+# if you are using this following code then don't forgot to give proper
+# credit to t.me/kAiF_00z (github.com/kaif-00z)
+
+import asyncio
+import json
+import os
+
+from functions.config import Var
+from functions.resources import BACKGROUND
+from libs.supervisor import Supervisor
+
+
+class MediaProbe:
+    """What mediainfo says about one version of a file, asked only once.
+
+    Probes are shared per path and thrown away when the size or mtime of
+    the file changes. The JSON probe only reads the headers, so the frame
+    count comes from the muxer's statistics tags or duration times fps,
+    and a --fullscan of the whole file is left for sources with neither.
+    """
+
+    cache = {}
+
+    def __init__(self, path, key):
+        self.path = path
+        self.key = key
+        self.lock = asyncio.Lock()
+        self.tracks = None
+        self.reports = {}
+        self.supervisor = Supervisor()
+
+    @classmethod
+    async def of(cls, path):
+        stat = os.stat(path)
+        key = (stat.st_size, stat.st_mtime)
+        probe = cls.cache.get(path)
+        if not probe or probe.key != key:
+            for gone in [i for i in cls.cache if not os.path.exists(i)]:
+                del cls.cache[gone]
+            probe = cls.cache[path] = cls(path, key)
+        async with probe.lock:
+            if probe.tracks is None:
+                probe.tracks = json.loads(await probe.report("JSON"))["media"]["track"]
+        return probe
+
+    async def report(self, output, fullscan=False):
+        """mediainfo's report in `output` (JSON, HTML...) format."""
+        if (output, fullscan) not in self.reports:
+            result = await self.supervisor.run(
+                ["mediainfo", self.path, f"--Output={output}"]
+                + (["--fullscan"] if fullscan else []),
+                resource=BACKGROUND,
+                timeout=Var.PROCESS_TIMEOUT,
+                retries=1,
+            )
+            if not result.ok or not result.out:
+                raise ValueError(f"Unable To Probe {self.path}: {result.error}")
+            self.reports[output, fullscan] = result.out
+        return self.reports[output, fullscan]
+
+    def _tracks(self, _type):
+        return [i for i in self.tracks if i["@type"] == _type]
+
+    @property
+    def general(self):
+        return self._tracks("General")[0]
+
+    @property
+    def video(self):
+        return (self._tracks("Video") or [{}])[0]
+
+    @property
+    def videos(self):
+        return self._tracks("Video")
+
+    @property
+    def audios(self):
+        return self._tracks("Audio")
+
+    @property
+    def duration(self):
+        return float(self.general.get("Duration") or self.video.get("Duration"))
+
+    async def frame_count(self):
+        if self.video.get("FrameCount"):
+            return int(self.video["FrameCount"])
+        if self.video.get("FrameRate"):
+            return round(self.duration * float(self.video["FrameRate"]))
+        # variable frame rate without statistics tags, count them all
+        tracks = json.loads(await self.report("JSON", True))["media"]["track"]
+        video = [i for i in tracks if i["@type"] == "Video"][0]
+        return int(video["FrameCount"])
+
+    @property
+    def bitrate(self):
+        """Video bitrate, that of the whole file when the muxer left it out."""
+        bitrate = self.video.get("BitRate") or self.general.get("OverallBitRate")
+        return float(bitrate) if bitrate else None
@@ -0,0 +1,66 @@
+#    This file is part of the AutoAnime distribution.
+#    Copyright (c) 2025 Kaif_00z
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, version 3.
+#
+#    This program is distributed in the hope that it will be useful, but
+#    WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+#    General Public License for more details.
+#
+# License can be found in <
+# https://github.com/kaif-00z/AutoAnimeBot/blob/main/LICENSE > .
+
+# if you are using this following code then don't forgot to give proper
+# credit to t.me/kAiF_00z (github.com/kaif-00z)
+
+import shutil
+
+from functions.config import Var
+
+
+class ResourceClass:
+    """CPU affinity, nice and ionice level a subprocess is started with.
+
+    The levels are applied through taskset/nice/ionice from util-linux, any
+    of them missing on the host is skipped.
+    """
+
+    def __init__(self, name, cpus, nice, ionice):
+        self.name = name
+        self.cpus = self.parse_cpus(cpus)
+        self.nice = nice
+        self.ionice = ionice
+
+    def parse_cpus(self, cpus):
+        result = set()
+        for part in (cpus or "").replace(" ", "").split(","):
+            if "-" in part:
+                start, end = part.split("-")
+                result.update(range(int(start), int(end) + 1))
+            elif part:
+                result.add(int(part))
+        return result
+
+    def prefix(self):
+        args = []
+        if self.cpus and shutil.which("taskset"):
+            args += ["taskset", "-c", ",".join(str(i) for i in sorted(self.cpus))]
+        if self.nice and shutil.which("nice"):
+            args += ["nice", "-n", str(self.nice)]
+        if self.ionice and shutil.which("ionice"):
+            _class, *level = self.ionice.split("/")
+            args += ["ionice", "-c", _class] + (["-n", level[0]] if level else [])
+        return args
+
+
+# main encodes, on the path to a published episode
+CRITICAL = ResourceClass("critical", Var.CRITICAL_CPUS, 0, "2/0")
+# screenshots, samples and mediainfo, leftover capacity only
+BACKGROUND = ResourceClass(
+    "background", Var.BACKGROUND_CPUS, Var.BACKGROUND_NICE, "3"
+)
+# downloads and full file scans
+IO = ResourceClass("io", Var.IO_CPUS, Var.IO_NICE, "2/4")
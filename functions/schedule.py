@@ -30,9 +30,10 @@ from libs.logger import LOGS, TelegramClient
 
 
 class ScheduleTasks:
-    def __init__(self, bot: TelegramClient):
+    def __init__(self, bot: TelegramClient, pipeline=None):
         self.tools = Tools()
         self.bot = bot
+        self.pipeline = pipeline
         if Var.SEND_SCHEDULE or Var.RESTART_EVERDAY:
             self.sch = AsyncIOScheduler(timezone="Asia/Kolkata")
             if Var.SEND_SCHEDULE:
@@ -59,5 +60,7 @@ class ScheduleTasks:
         except Exception as error:
             LOGS.error(str(error))
 
-    def restart(self):
+    async def restart(self, progress=None):
+        if self.pipeline:
+            await self.pipeline.drain(Var.DRAIN_TIMEOUT, progress)
         os.execl(sys.executable, sys.executable, "bot.py")
@@ -1,28 +1,40 @@
 import asyncio
-import json
 import math
 import os
-import re
-import subprocess
+import shutil
 import time
+from glob import glob
 from traceback import format_exc
 
 import aiofiles
 import aiohttp
+import anitopy
 import requests
 from html_telegraph_poster import TelegraphPoster
 from telethon.errors.rpcerrorlist import MessageNotModifiedError
 
+from functions.allocator import Allocation, allocator
 from functions.config import Var
+from functions.encoders import DEFAULT_PROFILE, EncoderProfile
+from functions.probe import MediaProbe
+from functions.resources import BACKGROUND, CRITICAL, IO
 from libs.logger import LOGS
+from libs.progress import ProgressParser
+from libs.supervisor import Supervisor
+
+# seconds encoded per probe and what the aac track is expected to add
+PROBE_SECONDS = 5
+AUDIO_BITRATE = 128000
 
 
 class Tools:
     def __init__(self):
-        if Var.DEV_MODE:
-            self.ffmpeg_threads = int(os.cpu_count() or 0) + 2
-        else:
-            self.ffmpeg_threads = 2
+        self.frames = 0
+        self.crf = Var.CRF
+        self.audio_codec = "aac"
+        self.profile = EncoderProfile.parse(DEFAULT_PROFILE)
+        self.stats = None
+        self.supervisor = Supervisor()
 
     async def async_searcher(
         self,
@@ -71,13 +83,7 @@ class Tools:
 
     async def mediainfo(self, file, bot):
         try:
-            process = await asyncio.create_subprocess_shell(
-                f"mediainfo '''{file}''' --Output=HTML",
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-            )
-            stdout, stderr = await process.communicate()
-            out = stdout.decode()
+            out = await (await MediaProbe.of(file)).report("HTML")
             client = TelegraphPoster(use_api=True)
             client.create_api_token("Mediainfo")
             page = client.post(
@@ -138,6 +144,12 @@ class Tools:
             raised_to_pow += 1
         return str(round(size, 2)) + " " + dict_power_n[raised_to_pow] + "B"
 
+    def button_rows(self, btns):
+        rows = [btns[:2]]
+        for btn in btns[2:]:
+            rows.append([btn])
+        return rows
+
     def ts(self, milliseconds: int) -> str:
         seconds, milliseconds = divmod(int(milliseconds), 1000)
         minutes, seconds = divmod(seconds, 60)
@@ -159,151 +171,762 @@ class Tools:
             return False, format_exc()
         return True, out
 
-    async def bash_(self, cmd, run_code=0):
-        process = await asyncio.create_subprocess_shell(
-            cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-        )
-        stdout, stderr = await process.communicate()
-        err = stderr.decode().strip() or None
-        out = stdout.decode().strip()
-        if not run_code and err:
-            if match := re.match("\\/bin\\/sh: (.*): ?(\\w+): not found", err):
-                return out, f"{match.group(2).upper()}_NOT_FOUND"
-        return out, err
-
     async def frame_counts(self, dl):
-        _x, _y = await self.bash_(
-            f'mediainfo --fullscan """{dl}""" | grep "Frame count"'
-        )
-        if _y and _y.endswith("NOT_FOUND"):
-            LOGS.error(f"ERROR: `{_y}`")
+        try:
+            return await (await MediaProbe.of(dl)).frame_count()
+        except BaseException:
+            LOGS.error(f"ERROR: `{format_exc()}`")
             return False
-        return _x.split(":")[1].split("\n")[0]
 
-    async def compress(self, dl, out, log_msg):
+    async def compress(
+        self, dl, out, log_msg, ss_path=None, sample_path=None, stream=None
+    ):
+        """Encodes dl into out, reading it from the `stream` fifo when given.
+
+        A streamed input is still downloading, so it is only probed, never
+        seeked, and the probe encodes and the chunked split are skipped.
+        """
         total_frames = await self.frame_counts(dl)
         if not total_frames:
             return False, "Unable to Count The Frames!"
-        _progress = f"progress-{time.time()}.txt"
-        cmd = f'''{Var.FFMPEG} -hide_banner -loglevel quiet -progress """{_progress}""" -i """{dl}""" -metadata "Encoded By"="https://github.com/kaif-00z/AutoAnimeBot/" -preset ultrafast -c:v libx265 -crf {Var.CRF} -map 0:v -c:a aac -map 0:a -c:s copy -map 0:s? -threads {self.ffmpeg_threads} """{out}""" -y'''
-        process = await asyncio.create_subprocess_shell(
-            cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        self.frames = int(total_frames)
+        copy_video, copy_audio = await self.stream_plan(dl)
+        self.audio_codec = "copy" if copy_audio else "aac"
+        if copy_video:
+            return await self.remux(dl, out, log_msg, total_frames, stream)
+        res = anitopy.parse(os.path.basename(dl)).get("video_resolution")
+        self.profile = EncoderProfile.for_resolution(res)
+        allocation = await allocator.acquire()
+        try:
+            if stream:
+                self.crf = Var.CRF
+            else:
+                self.crf = await self.target_crf(dl, allocation) or Var.CRF
+                if Var.CHUNKED_ENCODE and allocation.threads >= 2 * Var.CHUNK_THREADS:
+                    return await self.chunked(
+                        dl, out, log_msg, total_frames, allocation
+                    )
+            return await self._compress(
+                dl, out, log_msg, total_frames, allocation, ss_path, sample_path, stream
+            )
+        finally:
+            allocator.release(allocation)
+
+    async def stream_plan(self, dl):
+        """Which of the video and audio of dl can be copied instead of encoded.
+
+        The video is copied when it already is HEVC within the resolution's
+        COPY_BITRATES cap, the audio when every track already is AAC.
+        """
+        res = anitopy.parse(os.path.basename(dl)).get("video_resolution")
+        cap = self.parse_targets(Var.COPY_BITRATES).get(res)
+        if not cap and not Var.COPY_AUDIO:
+            return False, False
+        try:
+            probe = await MediaProbe.of(dl)
+            copy_video = False
+            if cap and len(probe.videos) == 1 and probe.video.get("Format") == "HEVC":
+                copy_video = bool(probe.bitrate) and probe.bitrate <= cap * 1000
+            copy_audio = (
+                Var.COPY_AUDIO
+                and bool(probe.audios)
+                and all(i.get("Format") == "AAC" for i in probe.audios)
+            )
+            LOGS.info(
+                f"{res}: {'Copying' if copy_video else 'Encoding'} Video, "
+                f"{'Copying' if copy_audio else 'Encoding'} Audio"
+            )
+            return copy_video, copy_audio
+        except BaseException:
+            LOGS.error(str(format_exc()))
+            return False, False
+
+    async def remux(self, dl, out, log_msg, total_frames, source=None):
+        args = [
+            Var.FFMPEG,
+            "-hide_banner",
+            "-loglevel",
+            "error",
+            "-progress",
+            "pipe:1",
+            "-i",
+            source or dl,
+            "-metadata",
+            "Encoded By=https://github.com/kaif-00z/AutoAnimeBot/",
+            "-map",
+            "0:v",
+            "-c:v",
+            "copy",
+            "-map",
+            "0:a",
+            "-c:a",
+            self.audio_codec,
+            "-map",
+            "0:s?",
+            "-c:s",
+            "copy",
+            out,
+            "-y",
+        ]
+        # a stream can't be read again
+        return await self.run_encode(
+            args, dl, [out], log_msg, total_frames, 0 if source else Var.PROCESS_RETRIES
         )
-        d_time = time.time()
-        while process.returncode != 0:
-            await asyncio.sleep(5)
-            with open(_progress, "r+") as fil:
-                text = fil.read()
-                frames = re.findall("frame=(\\d+)", text)
-                size = re.findall("total_size=(\\d+)", text)
-                speed = 0
-                if not os.path.exists(out) or os.path.getsize(out) == 0:
-                    return False, "Unable To Encode This Video!"
-                if len(frames):
-                    elapse = int(frames[-1])
-                if len(size):
-                    size = int(size[-1])
-                    per = elapse * 100 / int(total_frames)
-                    time_diff = time.time() - int(d_time)
-                    speed = round(elapse / time_diff, 2)
-                if int(speed) != 0:
-                    some_eta = ((int(total_frames) - elapse) / speed) * 1000
-                    text = f"**Successfully Downloaded The Anime**\n\n **File Name:** ```{dl.split('/')[-1]}```\n\n**STATUS:** \n"
-                    progress_str = "`[{0}{1}] {2}%\n\n`".format(
-                        "".join("●" for _ in range(math.floor(per / 5))),
-                        "".join("" for _ in range(20 - math.floor(per / 5))),
-                        round(per, 2),
+
+    def parse_targets(self, value):
+        targets = {}
+        for item in value.split("|"):
+            if ":" in item:
+                res, target = item.split(":", 1)
+                targets[res.strip()] = float(target)
+        return targets
+
+    async def target_crf(self, dl, allocation):
+        """CRF predicted to hit the resolution's target bitrate or size cap.
+
+        A few short probes spread over the episode are encoded at each of
+        PROBE_CRFS, and log(bitrate) is fitted linearly against the CRF.
+        """
+        res = anitopy.parse(os.path.basename(dl)).get("video_resolution")
+        bitrate = self.parse_targets(Var.TARGET_BITRATES).get(res)
+        cap = self.parse_targets(Var.SIZE_CAPS).get(res)
+        if not bitrate and not cap:
+            return
+        try:
+            tsec = await self.genss(dl)
+            targets = [bitrate * 1000] if bitrate else []
+            if cap:
+                targets.append(cap * 2**20 * 8 / tsec)
+            # probes are video only, leave room for the aac track
+            target = min(targets) - AUDIO_BITRATE
+            crfs = [int(i) for i in Var.PROBE_CRFS.split("|")]
+            share = Allocation(max(1, allocation.threads // 3))
+            points = []
+            for crf in crfs:
+                sizes = await asyncio.gather(
+                    *[
+                        self.probe(dl, tsec * at, crf, share)
+                        for at in (0.2, 0.5, 0.8)
+                    ]
+                )
+                if not all(sizes):
+                    return
+                points.append((crf, math.log(sum(sizes) * 8 / (3 * PROBE_SECONDS))))
+            n = len(points)
+            mean_x = sum(x for x, _ in points) / n
+            mean_y = sum(y for _, y in points) / n
+            slope = sum((x - mean_x) * (y - mean_y) for x, y in points) / sum(
+                (x - mean_x) ** 2 for x, _ in points
+            )
+            crf = mean_x + (math.log(max(1, target)) - mean_y) / slope
+            crf = round(min(max(crf, Var.CRF_MIN), Var.CRF_MAX), 1)
+            predicted = math.exp(mean_y + slope * (crf - mean_x)) + AUDIO_BITRATE
+            LOGS.info(
+                f"Picked CRF {crf} For {res}, "
+                f"Predicted ~{self.hbs(predicted * tsec / 8)}"
+            )
+            return crf
+        except BaseException:
+            LOGS.error(str(format_exc()))
+
+    async def probe(self, dl, start, crf, allocation):
+        out = f"probe-{time.time()}-{crf}-{int(start)}.mkv"
+        try:
+            result = await self.supervisor.run(
+                [
+                    Var.FFMPEG,
+                    "-hide_banner",
+                    "-loglevel",
+                    "error",
+                    "-ss",
+                    str(int(start)),
+                    "-i",
+                    dl,
+                    "-t",
+                    str(PROBE_SECONDS),
+                    "-map",
+                    "0:v:0",
+                    *self.profile.args(crf, allocation),
+                    "-threads",
+                    str(allocation.threads),
+                    out,
+                    "-y",
+                ],
+                resource=CRITICAL,
+                timeout=Var.PROCESS_TIMEOUT,
+                stall=Var.STALL_TIMEOUT,
+            )
+            if result.ok and os.path.exists(out):
+                return os.path.getsize(out)
+        finally:
+            if os.path.exists(out):
+                os.remove(out)
+
+    async def chunked(self, dl, out, log_msg, total_frames, allocation):
+        """Encodes keyframe-aligned segments of dl side by side.
+
+        The video is stream copied into segments at keyframes, each segment
+        is encoded by its own ffmpeg and the results are concatenated back
+        without re-encoding, with the audio and subtitles of the source.
+        """
+        workdir = f"chunks-{time.time()}"
+        os.mkdir(workdir)
+        workers = allocation.threads // Var.CHUNK_THREADS
+        share = Allocation(Var.CHUNK_THREADS)
+        tasks = []
+        try:
+            tsec = await self.genss(dl)
+            split = await self.supervisor.run(
+                [
+                    Var.FFMPEG,
+                    "-hide_banner",
+                    "-loglevel",
+                    "error",
+                    "-i",
+                    dl,
+                    "-map",
+                    "0:v:0",
+                    "-c",
+                    "copy",
+                    "-f",
+                    "segment",
+                    "-segment_time",
+                    # a few segments per worker, so they finish close together
+                    str(max(10, tsec // (workers * 3))),
+                    "-reset_timestamps",
+                    "1",
+                    f"{workdir}/src-%04d.mkv",
+                ],
+                resource=IO,
+                timeout=Var.PROCESS_TIMEOUT,
+                retries=1,
+            )
+            chunks = sorted(glob(f"{workdir}/src-*.mkv"))
+            if not split.ok or not chunks:
+                return False, f"Unable To Split This Video! {split.error}"
+            semaphore = asyncio.Semaphore(workers)
+            parsers = {chunk: ProgressParser() for chunk in chunks}
+
+            async def encode(chunk):
+                async with semaphore:
+                    return await self.supervisor.run(
+                        [
+                            Var.FFMPEG,
+                            "-hide_banner",
+                            "-loglevel",
+                            "error",
+                            "-progress",
+                            "pipe:1",
+                            "-i",
+                            chunk,
+                            *self.profile.args(self.crf, share),
+                            "-threads",
+                            str(share.threads),
+                            chunk.replace("src-", "enc-"),
+                            "-y",
+                        ],
+                        resource=CRITICAL,
+                        timeout=Var.ENCODE_TIMEOUT,
+                        stall=Var.STALL_TIMEOUT,
+                        retries=Var.PROCESS_RETRIES,
+                        progress=parsers[chunk],
+                    )
+
+            tasks = [asyncio.ensure_future(encode(chunk)) for chunk in chunks]
+            d_time = time.time()
+            _new_log_msg = log_msg
+            while not all(task.done() for task in tasks):
+                await asyncio.wait(tasks, timeout=5)
+                # one frame count for the episode, summed over the segments
+                events = [i.last for i in parsers.values() if i.last]
+                elapse = sum(i.frame for i in events)
+                size = sum(i.total_size for i in events)
+                _new_log_msg = (
+                    await self.report_progress(
+                        log_msg, dl, elapse, size, total_frames, d_time
                     )
-                    e_size = f"{self.hbs(size)} of ~{self.hbs((size / per) * 100)}"
-                    eta = f"~{self.ts(some_eta)}"
-                    try:
-                        _new_log_msg = await log_msg.edit(
-                            text
-                            + progress_str
-                            + "`"
-                            + e_size
-                            + "`"
-                            + "\n\n`"
-                            + eta
-                            + "`"
-                        )
-                    except MessageNotModifiedError:
-                        pass
+                    or _new_log_msg
+                )
+            failed = [task.result() for task in tasks if not task.result().ok]
+            if failed:
+                return False, f"Unable To Encode This Video! {failed[0].error}"
+            with open(f"{workdir}/concat.txt", "w") as file:
+                for chunk in chunks:
+                    name = os.path.basename(chunk).replace("src-", "enc-")
+                    file.write(f"file '{name}'\n")
+            concat = await self.supervisor.run(
+                [
+                    Var.FFMPEG,
+                    "-hide_banner",
+                    "-loglevel",
+                    "error",
+                    "-f",
+                    "concat",
+                    "-safe",
+                    "0",
+                    "-i",
+                    f"{workdir}/concat.txt",
+                    "-i",
+                    dl,
+                    "-metadata",
+                    "Encoded By=https://github.com/kaif-00z/AutoAnimeBot/",
+                    "-map",
+                    "0:v",
+                    "-c:v",
+                    "copy",
+                    "-map",
+                    "1:a",
+                    "-c:a",
+                    self.audio_codec,
+                    "-map",
+                    "1:s?",
+                    "-c:s",
+                    "copy",
+                    out,
+                    "-y",
+                ],
+                resource=CRITICAL,
+                timeout=Var.ENCODE_TIMEOUT,
+                stall=Var.STALL_TIMEOUT,
+                watch=[out],
+                retries=Var.PROCESS_RETRIES,
+            )
+            self.stats = concat.stats
+            for task in tasks:
+                self.stats.cpu += task.result().stats.cpu
+                self.stats.max_rss = max(
+                    self.stats.max_rss, task.result().stats.max_rss
+                )
+            if not concat.ok or not os.path.exists(out) or not os.path.getsize(out):
+                return False, f"Unable To Join The Segments! {concat.error}"
+            return True, _new_log_msg
+        finally:
+            for task in tasks:
+                task.cancel()
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    async def extra_outputs(self, dl, ss_path, sample_path):
+        """Screenshots and sample as extra outputs of the main encode.
+
+        They hang off a split of the decoded video, so the source is decoded
+        once instead of three times.
+        """
         try:
-            os.remove(_progress)
+            tsec = await self.genss(dl)
         except BaseException:
-            pass
+            LOGS.error(str(format_exc()))
+            return [], [], "0:v"
+        branches, outputs = ["[main]"], []
+        graph = ""
+        if ss_path:
+            os.makedirs(ss_path, exist_ok=True)
+            branches.append("[ss]")
+            graph += f";[ss]fps={Var.SS_COUNT / tsec}[shots]"
+            outputs += ["-map", "[shots]", "-frames:v", str(Var.SS_COUNT)]
+            outputs += [*self.ss_args(), f"{ss_path}/pic%02d.{Var.SS_FORMAT}"]
+        if sample_path:
+            start = round(tsec / 5)
+            branches.append("[sample]")
+            outputs += [
+                "-map",
+                "[sample]",
+                "-map",
+                "0:a",
+                "-map",
+                "0:s?",
+                "-ss",
+                str(start),
+                "-to",
+                str(min(start + 30, tsec)),
+                *EncoderProfile.parse(Var.SAMPLE_PROFILE).args(27),
+                "-c:a",
+                "aac",
+                "-c:s",
+                "copy",
+                sample_path,
+            ]
+        graph = f"[0:v]split={len(branches)}{''.join(branches)}" + graph
+        return ["-filter_complex", graph], outputs, "[main]"
+
+    async def _compress(
+        self,
+        dl,
+        out,
+        log_msg,
+        total_frames,
+        allocation,
+        ss_path,
+        sample_path,
+        source=None,
+    ):
+        filters, outputs, video = [], [], "0:v"
+        if ss_path or sample_path:
+            filters, outputs, video = await self.extra_outputs(
+                dl, ss_path, sample_path
+            )
+        args = [
+            Var.FFMPEG,
+            "-hide_banner",
+            "-loglevel",
+            "error",
+            "-progress",
+            "pipe:1",
+            "-i",
+            source or dl,
+            *filters,
+            "-metadata",
+            "Encoded By=https://github.com/kaif-00z/AutoAnimeBot/",
+            *self.profile.args(self.crf, allocation),
+            "-map",
+            video,
+            "-c:a",
+            self.audio_codec,
+            "-map",
+            "0:a",
+            "-c:s",
+            "copy",
+            "-map",
+            "0:s?",
+            "-threads",
+            str(allocation.threads),
+            out,
+            *outputs,
+            "-y",
+        ]
+        # a stream can't be read again
+        return await self.run_encode(
+            args, dl, [out], log_msg, total_frames, 0 if source else Var.PROCESS_RETRIES
+        )
+
+    async def run_encode(
+        self, args, dl, outs, log_msg, total_frames, retries=Var.PROCESS_RETRIES
+    ):
+        """Runs an ffmpeg writing `-progress pipe:1` and reports its progress.
+
+        The supervisor streams the progress into a parser its stall detector
+        listens to, and the message is edited from the latest event.
+        """
+        progress = ProgressParser()
+        process = asyncio.ensure_future(
+            self.supervisor.run(
+                args,
+                resource=CRITICAL,
+                timeout=Var.ENCODE_TIMEOUT,
+                stall=Var.STALL_TIMEOUT,
+                retries=retries,
+                progress=progress,
+            )
+        )
+        d_time = time.time()
+        _new_log_msg = log_msg
+        try:
+            while not process.done():
+                await asyncio.wait({process}, timeout=5)
+                if process.done() or not progress.last:
+                    continue
+                _new_log_msg = (
+                    await self.report_progress(
+                        log_msg,
+                        dl,
+                        progress.last.frame,
+                        progress.last.total_size,
+                        total_frames,
+                        d_time,
+                    )
+                    or _new_log_msg
+                )
+        finally:
+            # cancelling the supervisor kills ffmpeg with it
+            process.cancel()
+        result = process.result()
+        self.stats = result.stats
+        if not result.ok or not all(
+            os.path.exists(out) and os.path.getsize(out) for out in outs
+        ):
+            return False, f"Unable To Encode This Video! {result.error}"
         return True, _new_log_msg
 
-    async def genss(self, file):
-        process = subprocess.Popen(
-            ["mediainfo", file, "--Output=JSON"],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
+    async def report_progress(self, log_msg, dl, elapse, size, total_frames, d_time):
+        if not size or not elapse:
+            return
+        per = elapse * 100 / int(total_frames)
+        time_diff = time.time() - int(d_time)
+        speed = round(elapse / time_diff, 2)
+        if int(speed) == 0:
+            return
+        some_eta = ((int(total_frames) - elapse) / speed) * 1000
+        text = f"**Successfully Downloaded The Anime**\n\n **File Name:** ```{dl.split('/')[-1]}```\n\n**STATUS:** \n"
+        progress_str = "`[{0}{1}] {2}%\n\n`".format(
+            "".join("●" for _ in range(math.floor(per / 5))),
+            "".join("" for _ in range(20 - math.floor(per / 5))),
+            round(per, 2),
         )
-        stdout, stderr = process.communicate()
-        out = stdout.decode().strip()
-        z = json.loads(out)
-        p = z["media"]["track"][0]["Duration"]
-        return int(p.split(".")[-2])
+        e_size = f"{self.hbs(size)} of ~{self.hbs((size / per) * 100)}"
+        eta = f"~{self.ts(some_eta)}"
+        try:
+            return await log_msg.edit(
+                text + progress_str + "`" + e_size + "`" + "\n\n`" + eta + "`"
+            )
+        except MessageNotModifiedError:
+            pass
 
-    def stdr(self, seconds: int) -> str:
-        minutes, seconds = divmod(seconds, 60)
-        hours, minutes = divmod(minutes, 60)
-        if len(str(minutes)) == 1:
-            minutes = "0" + str(minutes)
-        if len(str(hours)) == 1:
-            hours = "0" + str(hours)
-        if len(str(seconds)) == 1:
-            seconds = "0" + str(seconds)
-        dur = (
-            ((str(hours) + ":") if hours else "00:")
-            + ((str(minutes) + ":") if minutes else "00:")
-            + ((str(seconds)) if seconds else "")
+    async def ladder(self, dl, outputs, log_msg):
+        """Encodes every rung of `outputs` ({height: path}) from one decode.
+
+        The scaled rungs come off a split of the decoded source and the tee
+        muxer writes them with the one audio encode they all share.
+        """
+        total_frames = await self.frame_counts(dl)
+        if not total_frames:
+            return False, "Unable to Count The Frames!"
+        self.frames = int(total_frames)
+        heights = list(outputs)
+        graph = f"[0:v]split={len(heights)}" + "".join(
+            f"[v{i}]" for i in range(len(heights))
         )
-        return dur
-
-    async def duration_s(self, file):
-        tsec = await self.genss(file)
-        x = round(tsec / 5)
-        y = round(tsec / 5 + 30)
-        pin = self.stdr(x)
-        if y < tsec:
-            pon = self.stdr(y)
-        else:
-            pon = self.stdr(tsec)
-        return pin, pon
+        for i, height in enumerate(heights):
+            graph += f";[v{i}]scale=-2:{height}[s{i}]"
+        # tee needs its own escaping for paths, so write plain names first
+        temp = {
+            height: os.path.join(
+                os.path.dirname(path), f"ladder-{time.time()}-{height}.mkv"
+            )
+            for height, path in outputs.items()
+        }
+        slaves = "|".join(
+            f"[f=matroska:select=\\'v:{i},a,s\\']{temp[height]}"
+            for i, height in enumerate(heights)
+        )
+        allocation = await allocator.acquire()
+        share = Allocation(max(1, allocation.threads // len(heights)))
+        try:
+            args = [
+                Var.FFMPEG,
+                "-hide_banner",
+                "-loglevel",
+                "error",
+                "-progress",
+                "pipe:1",
+                "-i",
+                dl,
+                "-filter_complex",
+                graph,
+                *[arg for i in range(len(heights)) for arg in ("-map", f"[s{i}]")],
+                "-map",
+                "0:a",
+                "-map",
+                "0:s?",
+                "-metadata",
+                "Encoded By=https://github.com/kaif-00z/AutoAnimeBot/",
+                # every rung runs its own encoder, with its resolution's profile
+                *[
+                    arg
+                    for i, height in enumerate(heights)
+                    for arg in EncoderProfile.for_resolution(f"{height}p").args(
+                        Var.CRF, share, stream=i
+                    )
+                ],
+                "-c:a",
+                "aac",
+                "-c:s",
+                "copy",
+                "-threads",
+                str(allocation.threads),
+                # tee can't tell the encoders matroska wants global headers
+                "-flags",
+                "+global_header",
+                "-f",
+                "tee",
+                slaves,
+                "-y",
+            ]
+            succ, out = await self.run_encode(
+                args, dl, list(temp.values()), log_msg, total_frames
+            )
+        finally:
+            allocator.release(allocation)
+        for height, path in temp.items():
+            if succ:
+                os.rename(path, outputs[height])
+            elif os.path.exists(path):
+                os.remove(path)
+        return succ, out
+
+    async def genss(self, file):
+        return int((await MediaProbe.of(file)).duration)
 
-    async def gen_ss_sam(self, _hash, filename):
+    def ss_args(self):
+        if Var.SS_FORMAT == "webp":
+            return ["-c:v", "libwebp", "-quality", "80"]
+        if Var.SS_FORMAT == "jpg":
+            return ["-q:v", "3"]
+        return []
+
+    async def gen_ss(self, _hash, filename):
+        """SS_COUNT evenly spaced screenshots, all taken side by side.
+
+        Each one seeks the input (`-ss` before `-i`) to the keyframe before
+        its timestamp, so only a few frames get decoded instead of the file.
+        """
         try:
-            ss_path, sp_path = None, None
             os.mkdir(_hash)
             tsec = await self.genss(filename)
-            fps = 10 / tsec
-            ncmd = f"ffmpeg -i '{filename}' -vf fps={fps} -vframes 10 '{_hash}/pic%01d.png'"
-            process = await asyncio.create_subprocess_shell(
-                ncmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
-            )
-            await process.communicate()
-            ss, dd = await self.duration_s(filename)
-            __ = filename.split(".mkv")[-2]
-            out = __ + "_sample.mkv"
-            _ncmd = f'ffmpeg -i """{filename}""" -preset ultrafast -ss {ss} -to {dd} -c:v libx265 -crf 27 -map 0:v -c:a aac -map 0:a -c:s copy -map 0:s? """{out}""" -y'
-            process = await asyncio.create_subprocess_shell(
-                _ncmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+            results = await asyncio.gather(
+                *[
+                    self.screenshot(
+                        filename,
+                        tsec * (i + 0.5) / Var.SS_COUNT,
+                        f"{_hash}/pic{i + 1:02d}.{Var.SS_FORMAT}",
+                    )
+                    for i in range(Var.SS_COUNT)
+                ]
             )
-            stdout, stderr = await process.communicate()
-            er = stderr.decode().strip()
-            try:
-                if er:
-                    if not os.path.exists(out) or os.path.getsize(out) == 0:
-                        LOGS.error(str(er))
-                        return (ss_path, sp_path)
-            except BaseException:
-                pass
-            return _hash, out
+            if not any(results):
+                return None
+            return _hash
+        except Exception as error:
+            LOGS.error(str(error))
+            LOGS.exception(format_exc())
+
+    async def screenshot(self, filename, at, out):
+        result = await self.supervisor.run(
+            [
+                Var.FFMPEG,
+                "-hide_banner",
+                "-loglevel",
+                "error",
+                "-ss",
+                str(round(at, 3)),
+                "-i",
+                filename,
+                "-frames:v",
+                "1",
+                *self.ss_args(),
+                out,
+                "-y",
+            ],
+            resource=BACKGROUND,
+            timeout=Var.PROCESS_TIMEOUT,
+            stall=Var.STALL_TIMEOUT,
+            retries=1,
+        )
+        if not os.path.exists(out) or not os.path.getsize(out):
+            LOGS.error(f"Screenshot At {round(at)}s Failed: {result.error}")
+            return None
+        return out
+
+    async def gen_sample(self, filename):
+        """30 seconds from a fifth into `filename`, the encoded episode.
+
+        With SAMPLE_MODE=copy the clip is stream copied, the input seek snaps
+        its start to the keyframe before it, so nothing gets encoded. It is
+        only encoded again when the copy fails or SAMPLE_MODE=encode.
+        """
+        try:
+            tsec = await self.genss(filename)
+            start = round(tsec / 5)
+            length = min(30, tsec - start)
+            out = filename.split(".mkv")[-2] + "_sample.mkv"
+            if Var.SAMPLE_MODE == "copy":
+                result = await self.cut_sample(filename, start, length, out, True)
+                if os.path.exists(out) and os.path.getsize(out):
+                    return out
+                LOGS.warning(f"Sample Copy Failed, Encoding It: {result.error}")
+            result = await self.cut_sample(filename, start, length, out, False)
+            if not os.path.exists(out) or os.path.getsize(out) == 0:
+                LOGS.error(str(result.error))
+                return None
+            return out
         except Exception as error:
             LOGS.error(str(error))
             LOGS.exception(format_exc())
+
+    async def cut_sample(self, filename, start, length, out, copy):
+        if copy:
+            codecs = ["-c", "copy", "-avoid_negative_ts", "make_zero"]
+        else:
+            codecs = [
+                *EncoderProfile.parse(Var.SAMPLE_PROFILE).args(27),
+                "-c:a",
+                "aac",
+                "-c:s",
+                "copy",
+            ]
+        return await self.supervisor.run(
+            [
+                Var.FFMPEG,
+                "-hide_banner",
+                "-loglevel",
+                "error",
+                "-ss",
+                str(start),
+                "-i",
+                filename,
+                "-t",
+                str(length),
+                "-map",
+                "0:v",
+                "-map",
+                "0:a",
+                "-map",
+                "0:s?",
+                *codecs,
+                out,
+                "-y",
+            ],
+            resource=BACKGROUND,
+            timeout=Var.PROCESS_TIMEOUT,
+            stall=Var.STALL_TIMEOUT,
+            watch=[out],
+            retries=0 if copy else 1,
+        )
+
+    async def generate_360p(self, file_path, output_path):
+        allocation = await allocator.acquire()
+        try:
+            LOGS.info(f"Generating 360p version for {file_path}...")
+            result = await self.supervisor.run(
+                [
+                    Var.FFMPEG,
+                    "-hide_banner",
+                    "-loglevel",
+                    "error",
+                    "-i",
+                    file_path,
+                    "-vf",
+                    "scale=-2:360",
+                    *EncoderProfile.for_resolution("360p", "x264,fast").args(
+                        28, allocation
+                    ),
+                    "-c:a",
+                    "copy",
+                    "-map",
+                    "0:v",
+                    "-map",
+                    "0:a",
+                    "-c:s",
+                    "copy",
+                    "-map",
+                    "0:s?",
+                    "-threads",
+                    str(allocation.threads),
+                    output_path,
+                    "-y",
+                ],
+                resource=CRITICAL,
+                timeout=Var.ENCODE_TIMEOUT,
+                stall=Var.STALL_TIMEOUT,
+                watch=[output_path],
+                retries=Var.PROCESS_RETRIES,
+            )
+            if not result.ok:
+                raise RuntimeError(f"Unable To Generate 360p: {result.error}")
+            LOGS.info(f"✅ 360p version saved at {output_path}")
+            return output_path
+        except BaseException:
+            # a partial file would pass as the downloaded 360p
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            raise
+        finally:
+            allocator.release(allocation)
@@ -25,6 +25,7 @@ from telethon import __version__ as _t_v
 from telethon import events
 
 from core.bot import Bot, Var, asyncio
+from core.taskgraph import TaskGraph
 from database import DataBase
 from functions.tools import Tools
 
@@ -61,6 +62,10 @@ class AdminUtils:
                 Button.inline("📜 LOGS", data="slog"),
                 Button.inline("♻️ Restart", data="sret"),
             ],
+            [
+                Button.inline("📊 Pipeline Status", data="psta"),
+                Button.inline("🧩 Episode Tasks", data="etsk"),
+            ],
             [
                 Button.inline("🎞️ Encode [Toogle]", data="entg"),
             ],
@@ -80,8 +85,23 @@ class AdminUtils:
         )
 
     async def _restart(self, e, schedule):
-        await e.reply("`Restarting...`")
-        schedule.restart()
+        msg = await e.reply("`Restarting...`")
+        await schedule.restart(msg.edit)
+
+    async def _pipeline_status(self, e, pipeline):
+        await e.edit(pipeline.status(), buttons=self.back_btn())
+
+    async def _episode_tasks(self, e):
+        await e.edit(
+            TaskGraph.status(),
+            buttons=[[Button.inline("🛑 Cancel All", data="ecan")], *self.back_btn()],
+        )
+
+    async def _cancel_tasks(self, e):
+        TaskGraph.cancel_all()
+        await e.edit(
+            "`Cancelled All Running Episode Tasks`", buttons=self.back_btn()
+        )
 
     async def _encode_t(self, e):
         if await self.db.is_original_upload():
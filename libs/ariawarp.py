@@ -17,22 +17,488 @@
 # credit to t.me/kAiF_00z (github.com/kaif-00z)
 
 import asyncio
+import hashlib
+import os
+import re
+import secrets
+import shutil
+import time
+from traceback import format_exc
+from urllib.parse import quote
+
+import aiofiles
+import aiohttp
+
+from functions.config import Var
+from functions.resources import IO
+from libs.logger import LOGS
+from libs.supervisor import Supervisor
+
+STATUS_KEYS = [
+    "status",
+    "totalLength",
+    "completedLength",
+    "downloadSpeed",
+    "connections",
+    "followedBy",
+    "errorMessage",
+    "bitfield",
+    "pieceLength",
+    "files",
+]
+# prioritising every piece from the head makes aria2 pick them in order
+IN_ORDER = {"bt-prioritize-piece": "head=1000000M", "stream-piece-selector": "inorder"}
+
+
+class PieceStream:
+    """Copies a single file download into a fifo in order, while it downloads.
+
+    Only the pieces up to the first missing one are copied, so the reader
+    (ffmpeg) just blocks until the bytes it needs are in. `ready` is set once
+    the head of the file is there, for probing it. `failed` is set when the
+    download can't be streamed, like a torrent of several files.
+    """
+
+    def __init__(self, fifo, head=4 * 2**20):
+        self.fifo = fifo
+        self.head = head
+        self.path = None
+        self.length = 0
+        self.available = 0
+        self.offset = 0
+        self.done = False
+        self.failed = False
+        self.ready = asyncio.Event()
+        self.changed = asyncio.Event()
+
+    def update(self, status, done=False):
+        files = [i for i in status.get("files", []) if i.get("selected") != "false"]
+        if (
+            len(files) != 1
+            or status.get("followedBy")
+            or files[0]["path"].startswith("[METADATA]")
+        ):
+            # metadata of a magnet, the file comes in the next download
+            self.failed = len(files) > 1
+            self.changed.set()
+            return
+        self.path = files[0]["path"]
+        self.length = int(files[0]["length"])
+        self.done = done
+        if done:
+            self.available = self.length
+        else:
+            pieces = 0
+            for char in status.get("bitfield", ""):
+                nibble = int(char, 16)
+                ones = next((i for i in range(4) if not nibble & 8 >> i), 4)
+                pieces += ones
+                if ones < 4:
+                    break
+            self.available = min(pieces * int(status["pieceLength"]), self.length)
+        if self.available >= min(self.head, self.length) and self.length:
+            self.ready.set()
+        self.changed.set()
+
+    async def pump(self):
+        loop = asyncio.get_running_loop()
+        fd = None
+        try:
+            while True:
+                await self.changed.wait()
+                self.changed.clear()
+                if self.failed:
+                    return
+                if self.path and self.available > self.offset:
+                    while fd is None:
+                        try:
+                            # fails with ENXIO until the reader opened its end
+                            fd = os.open(self.fifo, os.O_WRONLY | os.O_NONBLOCK)
+                            os.set_blocking(fd, True)
+                        except OSError:
+                            await asyncio.sleep(0.5)
+                    async with aiofiles.open(self.path, "rb") as file:
+                        await file.seek(self.offset)
+                        while self.offset < self.available:
+                            chunk = await file.read(
+                                min(2**20, self.available - self.offset)
+                            )
+                            await loop.run_in_executor(None, os.write, fd, chunk)
+                            self.offset += len(chunk)
+                if self.done and self.offset >= self.length:
+                    return
+        except BrokenPipeError:
+            LOGS.error(f"Reader Of {self.fifo} Went Away")
+        finally:
+            if fd is not None:
+                os.close(fd)
+
+
+class Aria2:
+    """One long lived aria2c for every download, driven over JSON-RPC.
+
+    The DHT and the session are kept on disk, so the swarm is warm and
+    unfinished downloads resume after a restart. Completion is pushed over
+    the websocket, tellStatus polls fill in the progress in between.
+    """
+
+    def __init__(self):
+        self.supervisor = Supervisor()
+        self.secret = Var.ARIA2_SECRET or self.saved_secret()
+        self.url = f"http://127.0.0.1:{Var.ARIA2_PORT}/jsonrpc"
+        self.process = None
+        self.session = None
+        self.listener = None
+        self.events = {}
+        self.lock = asyncio.Lock()
+
+    def saved_secret(self):
+        # kept beside the session, so the daemon is reused after a restart
+        path = f"{Var.ARIA2_SESSION}.secret"
+        if os.path.exists(path):
+            with open(path) as file:
+                return file.read().strip()
+        secret = secrets.token_hex(16)
+        with open(path, "w") as file:
+            file.write(secret)
+        os.chmod(path, 0o600)
+        return secret
+
+    def args(self):
+        # aria2 refuses a missing --input-file
+        open(Var.ARIA2_SESSION, "a").close()
+        return [
+            "aria2c",
+            "--enable-rpc",
+            f"--rpc-listen-port={Var.ARIA2_PORT}",
+            f"--rpc-secret={self.secret}",
+            f"--input-file={Var.ARIA2_SESSION}",
+            f"--save-session={Var.ARIA2_SESSION}",
+            "--save-session-interval=30",
+            "--enable-dht=true",
+            f"--dht-file-path={os.path.abspath(Var.ARIA2_DHT)}",
+            "--continue=true",
+            "--seed-time=0",
+            "--max-connection-per-server=10",
+            f"--max-concurrent-downloads={Var.ARIA2_MAX_DOWNLOADS}",
+            f"--max-overall-download-limit={Var.ARIA2_DOWNLOAD_LIMIT}",
+            f"--max-overall-upload-limit={Var.ARIA2_UPLOAD_LIMIT}",
+            "--quiet=true",
+            # pieces have to be on disk before they're streamed
+            *(["--disk-cache=0"] if Var.STREAM_ENCODE else []),
+        ]
+
+    async def start(self):
+        async with self.lock:
+            if self.process and not self.process.done():
+                return
+            self.session = self.session or aiohttp.ClientSession()
+            try:
+                # still running from before a restart or a crash
+                await self.call("aria2.getVersion")
+            except aiohttp.ClientError:
+                await self.spawn()
+            except ValueError as error:
+                # another aria2c holds the port, a new one couldn't bind it
+                raise RuntimeError(
+                    f"aria2c On Port {Var.ARIA2_PORT} Refused Our Secret ({error}), "
+                    "Stop It Or Set ARIA2_SECRET To Its Secret"
+                )
+            if not self.listener or self.listener.done():
+                self.listener = asyncio.ensure_future(self.listen())
+
+    async def spawn(self):
+        self.process = asyncio.ensure_future(
+            self.supervisor.run(self.args(), resource=IO, name="aria2c")
+        )
+        for _ in range(20):
+            await asyncio.sleep(0.5)
+            if self.process.done():
+                raise RuntimeError(f"aria2c Exited: {self.process.result().error}")
+            try:
+                await self.call("aria2.getVersion")
+                break
+            except aiohttp.ClientError:
+                continue
+        LOGS.info(f"aria2c Listening On {self.url}")
+
+    async def shutdown(self):
+        """Stops aria2c, which saves its session for the next start."""
+        if not self.session:
+            return
+        if self.listener:
+            self.listener.cancel()
+        try:
+            await self.call("aria2.shutdown")
+            for _ in range(60):
+                # gone once the port stops answering, not a dying daemon
+                # for the next start() to pick up
+                await asyncio.sleep(0.5)
+                await self.call("aria2.getVersion")
+        except aiohttp.ClientError:
+            pass
+        except BaseException:
+            LOGS.error(str(format_exc()))
+        await self.session.close()
+        self.session = None
+
+    async def call(self, method, *params):
+        async with self.session.post(
+            self.url,
+            json={
+                "jsonrpc": "2.0",
+                "id": method,
+                "method": method,
+                "params": [f"token:{self.secret}", *params],
+            },
+        ) as response:
+            data = await response.json(content_type=None)
+        if "error" in data:
+            raise ValueError(f"{method}: {data['error']['message']}")
+        return data["result"]
+
+    async def listen(self):
+        while True:
+            try:
+                async with self.session.ws_connect(
+                    self.url.replace("http", "ws", 1)
+                ) as ws:
+                    async for message in ws:
+                        # onDownloadComplete, onDownloadError, onBtDownloadComplete...
+                        for event in message.json().get("params", []):
+                            if event.get("gid") in self.events:
+                                self.events[event["gid"]].set()
+            except Exception:
+                LOGS.error(str(format_exc()))
+            await asyncio.sleep(5)
+
+    async def find(self, link):
+        # a magnet added before a restart is back from the session already
+        match = re.search("urn:btih:([0-9a-zA-Z]+)", link)
+        if not match:
+            return
+        downloads = await self.call("aria2.tellActive", ["gid", "infoHash"])
+        downloads += await self.call("aria2.tellWaiting", 0, 1000, ["gid", "infoHash"])
+        for download in downloads:
+            if download.get("infoHash", "").lower() == match.group(1).lower():
+                return download["gid"]
+
+    async def download(self, link, path, progress=None, stream=None):
+        """Waits for `link` to finish downloading into `path`.
+
+        `progress(done, total, speed, connections)` is awaited with every
+        status, the download is removed once it stalls or times out. With a
+        PieceStream, pieces are fetched in order and handed to it.
+        """
+        await self.start()
+        options = {"dir": os.path.abspath(path), **(IN_ORDER if stream else {})}
+        gid = await self.find(link) or await self.call(
+            "aria2.addUri", [link], options
+        )
+        started = seen = time.time()
+        done = -1
+        try:
+            while True:
+                event = self.events.setdefault(gid, asyncio.Event())
+                try:
+                    await asyncio.wait_for(event.wait(), 1 if stream else 5)
+                except asyncio.TimeoutError:
+                    pass
+                event.clear()
+                status = await self.call("aria2.tellStatus", gid, STATUS_KEYS)
+                if stream:
+                    stream.update(status, status["status"] == "complete")
+                if status["status"] == "complete":
+                    self.events.pop(gid, None)
+                    if not status.get("followedBy"):
+                        return True
+                    # the magnet's metadata is done, now the files themselves
+                    gid = status["followedBy"][0]
+                    continue
+                if status["status"] in ("error", "removed"):
+                    self.events.pop(gid, None)
+                    LOGS.error(f"Download {gid} Failed: {status.get('errorMessage')}")
+                    return False
+                now = time.time()
+                if int(status["completedLength"]) != done:
+                    done, seen = int(status["completedLength"]), now
+                if (
+                    now - seen > Var.STALL_TIMEOUT
+                    or now - started > Var.DOWNLOAD_TIMEOUT
+                ):
+                    LOGS.error(f"Download {gid} Stalled Or Timed Out, Removing It")
+                    self.events.pop(gid, None)
+                    await self.call("aria2.forceRemove", gid)
+                    return False
+                if progress:
+                    await progress(
+                        done,
+                        int(status["totalLength"]),
+                        int(status["downloadSpeed"]),
+                        int(status["connections"]),
+                    )
+        except asyncio.CancelledError:
+            # a lost race or a dropped job, aria2 would keep downloading it
+            self.events.pop(gid, None)
+            try:
+                await self.call("aria2.forceRemove", gid)
+            except BaseException:
+                pass
+            raise
 
 
 class Torrent:
     def __init__(self) -> None:
-        self.cmd = """aria2c '''{link}''' -x 10 -j 10 --seed-time=0 -d '{path}'"""
+        self.supervisor = Supervisor()
+        self.aria2 = Aria2() if Var.ARIA2_RPC else None
 
-    async def bash(self, cmd):
-        process = await asyncio.create_subprocess_shell(
-            cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
+    async def download_magnet(self, link: str, path: str, progress=None, stream=None):
+        if self.aria2:
+            return await self.aria2.download(link, path, progress, stream)
+        # a folder of its own, so other downloads and encodes writing into
+        # path don't count as progress of this one
+        folder = os.path.join(
+            path, ".aria2c", hashlib.sha1(link.encode()).hexdigest()[:12]
         )
-        stdout, stderr = await process.communicate()
-        err = stderr.decode().strip() or None
-        out = stdout.decode().strip()
-        return out, err
+        os.makedirs(folder, exist_ok=True)
+        result = await self.supervisor.run(
+            [
+                "aria2c",
+                link,
+                "-x",
+                "10",
+                "-j",
+                "10",
+                "--seed-time=0",
+                "--summary-interval=0",
+                "-d",
+                folder,
+            ],
+            resource=IO,
+            timeout=Var.DOWNLOAD_TIMEOUT,
+            stall=Var.STALL_TIMEOUT,
+            watch=[folder],
+            retries=Var.PROCESS_RETRIES,
+        )
+        if result.ok:
+            for name in os.listdir(folder):
+                if not name.endswith(".aria2"):
+                    os.replace(os.path.join(folder, name), os.path.join(path, name))
+        shutil.rmtree(folder, ignore_errors=True)
+        try:
+            os.rmdir(os.path.dirname(folder))
+        except OSError:
+            pass  # another download still uses it
+        return result.ok
+
+    def sources(self, link, name):
+        """The release's magnet, with the extra trackers, then its mirrors."""
+        sources = []
+        if link.startswith("magnet:"):
+            trackers = [i.strip() for i in Var.TRACKERS.split(",") if i.strip()]
+            sources.append(link + "".join(f"&tr={quote(i, safe='')}" for i in trackers))
+        elif link:
+            sources.append(link)
+        for mirror in Var.MIRRORS.split("|"):
+            if mirror.strip():
+                sources.append(mirror.strip().replace("{name}", quote(name)))
+        return sources
+
+    async def race(self, link: str, path: str, name: str, size=0, progress=None):
+        """Downloads `name` into `path` from whichever source finishes first.
+
+        Each source downloads into a directory of its own, a new one joins
+        every RACE_DELAY seconds or as soon as none is left running. The
+        first one to finish with a matching file wins and the rest are
+        cancelled. Torrents check their own pieces, a mirror only has the
+        `size` from the feed to match against.
+        """
+        sources = self.sources(link, name)
+        if len(sources) < 2:
+            return bool(sources) and await self.download_magnet(
+                sources[0], path, progress
+            )
+        root = os.path.join(
+            path, ".race", hashlib.sha1(name.encode()).hexdigest()[:12]
+        )
+        queue = list(enumerate(sources))
+        running = {}
+        reported = {}
+        started = 0
+
+        def report(index):
+            async def _report(done, total, speed, connections):
+                # only the source furthest along is shown
+                reported[index] = done
+                if progress and done >= max(reported.values()):
+                    await progress(done, total, speed, connections)
+
+            return _report
+
+        try:
+            while queue or running:
+                if queue and (not running or time.time() >= started + Var.RACE_DELAY):
+                    index, source = queue.pop(0)
+                    task = asyncio.ensure_future(
+                        self.download_magnet(
+                            source, os.path.join(root, str(index)), report(index)
+                        )
+                    )
+                    running[task] = index
+                    started = time.time()
+                wait = max(0, started + Var.RACE_DELAY - time.time())
+                finished, _ = await asyncio.wait(
+                    running,
+                    timeout=wait if queue else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                for task in finished:
+                    index = running.pop(task)
+                    file = self.winner(task, root, index, name, size, sources)
+                    if file:
+                        os.replace(file, os.path.join(path, name))
+                        LOGS.info(f"Downloaded {name} From Source {index + 1}")
+                        return True
+            return False
+        finally:
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+            shutil.rmtree(root, ignore_errors=True)
+            try:
+                os.rmdir(os.path.dirname(root))
+            except OSError:
+                pass  # another race still uses it
 
-    async def download_magnet(self, link: str, path: str):
-        await self.bash(self.cmd.format(link=link, path=path))
+    def winner(self, task, root, index, name, size, sources):
+        source = sources[index]
+        if task.exception() or not task.result():
+            LOGS.warning(f"Source {index + 1} Of {name} Failed")
+            return
+        folder = os.path.join(root, str(index))
+        files = [
+            os.path.join(base, file)
+            for base, _, names in os.walk(folder)
+            for file in names
+            if not file.endswith(".aria2")
+        ]
+        if os.path.join(folder, name) in files:
+            file = os.path.join(folder, name)
+        elif len(files) == 1:
+            # a mirror may name the file after its url
+            file = files[0]
+        else:
+            LOGS.warning(f"Source {index + 1} Of {name} Has No Single File")
+            return
+        if (
+            not source.startswith("magnet:")
+            and size
+            # the feed size is rounded, like `1.37 GiB`
+            and abs(os.path.getsize(file) - size) > size * 0.01
+        ):
+            LOGS.warning(
+                f"Source {index + 1} Of {name} Is {os.path.getsize(file)} Bytes, "
+                f"Expected About {size}"
+            )
+            return
+        return file
@@ -21,7 +21,7 @@ import logging
 from traceback import format_exc
 
 from telethon import TelegramClient
-from telethon.errors.rpcerrorlist import FloodWaitError
+from telethon.errors.rpcerrorlist import FloodWaitError, MessageNotModifiedError
 
 from functions.config import Var
 
@@ -64,6 +64,16 @@ class Reporter:
         )
         self.msg = msg
 
+    async def downloading(self, done, total, speed, connections):
+        if not self.msg or not total:
+            return
+        try:
+            self.msg = await self.msg.edit(
+                f"**New Anime Released**\n\n **File Name:** ```{self.file_name}```\n\n**STATUS:** `Downloading... {round(done * 100 / total, 2)}%`\n\n`{round(done / 2**20, 1)} MB of {round(total / 2**20, 1)} MB At {round(speed / 2**20, 2)} MB/s, {connections} Peers`",
+            )
+        except MessageNotModifiedError:
+            pass
+
     async def started_compressing(self):
         self.msg = await self.msg.edit(
             f"**Successfully Downloaded The Anime**\n\n **File Name:** ```{self.file_name}```\n\n**STATUS:** `Encoding...`",
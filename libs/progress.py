@@ -0,0 +1,83 @@
+#    This file is part of the AutoAnime distribution.
+#    Copyright (c) 2025 Kaif_00z
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, version 3.
+#
+#    This program is distributed in the hope that it will be useful, but
+#    WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+#    General Public License for more details.
+#
+# License can be found in <
+# https://github.com/kaif-00z/AutoAnimeBot/blob/main/LICENSE > .
+
+# if you are using this following code then don't forgot to give proper
+# credit to t.me/kAiF_00z (github.com/kaif-00z)
+
+from traceback import format_exc
+
+from libs.logger import LOGS
+
+
+class ProgressEvent:
+    """One block of ffmpeg `-progress` output, "N/A" values read as 0."""
+
+    def __init__(self, fields):
+        self.frame = self._number(fields.get("frame"), int)
+        self.fps = self._number(fields.get("fps"))
+        # kbits/s
+        self.bitrate = self._number(fields.get("bitrate", "").replace("kbits/s", ""))
+        self.total_size = self._number(fields.get("total_size"), int)
+        # seconds of output written, from the microsecond field
+        self.out_time = self._number(fields.get("out_time_us"), int) / 1e6
+        self.speed = self._number(fields.get("speed", "").rstrip("x"))
+        self.done = fields.get("progress") == "end"
+
+    def _number(self, value, cast=float):
+        try:
+            return cast(value)
+        except (TypeError, ValueError):
+            return cast(0)
+
+
+class ProgressParser:
+    """Incremental parser for `ffmpeg -progress pipe:1`.
+
+    Chunks of the pipe are fed in as they arrive, only the unfinished last
+    line is kept around. Every `progress=` line closes a block, which goes
+    out to the subscribers as a ProgressEvent and is kept as `last`.
+    """
+
+    def __init__(self):
+        self.subscribers = []
+        self.reset()
+
+    def reset(self):
+        self.buffer = b""
+        self.fields = {}
+        self.last = None
+
+    def subscribe(self, callback):
+        self.subscribers.append(callback)
+
+    def feed(self, chunk):
+        self.buffer += chunk
+        *lines, self.buffer = self.buffer.split(b"\n")
+        for line in lines:
+            key, _, value = line.decode(errors="ignore").strip().partition("=")
+            if not key:
+                continue
+            self.fields[key] = value.strip()
+            if key == "progress":
+                self.emit(ProgressEvent(self.fields))
+                self.fields = {}
+
+    def emit(self, event):
+        self.last = event
+        for callback in self.subscribers:
+            try:
+                callback(event)
+            except BaseException:
+                LOGS.error(str(format_exc()))
@@ -1,4 +1,5 @@
 import asyncio
+import calendar
 import hashlib
 import shutil
 import sys
@@ -9,12 +10,13 @@ import anitopy
 from feedparser import parse
 
 from database import LOGS, DataBase
-from core.executors import Executors
+from functions.config import Var
 
 
 class SubsPlease:
-    def __init__(self, dB: DataBase):
+    def __init__(self, dB: DataBase, pipeline=None):
         self.db = dB
+        self.pipeline = pipeline
 
     def digest(self, string: str):
         """Generate a unique hash for an anime release."""
@@ -30,7 +32,7 @@ class SubsPlease:
             LOGS.error(format_exc())
         sys.exit(0)
 
-    def rss_feed_data(self):
+    async def rss_feed_data(self):
         """Fetch RSS feeds for available resolutions."""
         try:
             urls = {
@@ -38,7 +40,12 @@ class SubsPlease:
                 "720p": "https://subsplease.org/rss/?r=720",
                 "480p": "https://subsplease.org/rss/?r=480",
             }
-            feeds = {res: parse(url) for res, url in urls.items()}
+            # feedparser blocks, so fetch the three feeds side by side
+            # off the event loop
+            parsed = await asyncio.gather(
+                *[asyncio.to_thread(parse, url) for url in urls.values()]
+            )
+            feeds = dict(zip(urls, parsed))
 
             # Check if all feeds are empty
             if all(not feeds[res].entries for res in feeds):
@@ -53,18 +60,19 @@ class SubsPlease:
             LOGS.error(f"RSS Feed Error: {format_exc()}")
             return None, None, None
 
-    async def feed_optimizer(self):
-        """Process the latest anime releases and filter out batches."""
-        d1080, d720, d480 = self.rss_feed_data()
+    async def feed_backlog(self):
+        """Every un-uploaded release in the feeds, oldest air date first."""
+        d1080, d720, d480 = await self.rss_feed_data()
         if not d1080 or not d720 or not d480:
-            return None
+            return []
 
         # Get the minimum number of available entries to avoid IndexError
         num_entries = min(len(d1080.entries), len(d720.entries), len(d480.entries))
         if num_entries == 0:
             LOGS.warning("❌ No anime entries available in feed.")
-            return None
+            return []
 
+        releases = []
         for i in range(num_entries - 1, -1, -1):  # Loop through available entries
             try:
                 f1080, f720, f480 = d1080.entries[i], d720.entries[i], d480.entries[i]
@@ -79,48 +87,71 @@ class SubsPlease:
                         continue  # ✅ Skip batch releases
 
                     uid = self.digest(f1080.title + f720.title + f480.title)
-                    if not await self.db.is_anime_uploaded(uid):
-                        return {
+                    if self.pipeline and self.pipeline.is_processing(uid):
+                        continue
+                    releases.append(
+                        {
                             "uid": uid,
+                            "published": (
+                                calendar.timegm(f1080.published_parsed)
+                                if f1080.get("published_parsed")
+                                else None
+                            ),
                             "1080p": f1080,
                             "720p": f720,
                             "480p": f480,
                         }
+                    )
             except IndexError:
                 LOGS.error(f"❌ IndexError: List index out of range at {i}")
             except Exception:
                 LOGS.error(format_exc())
 
-        return None
+        uids = [i["uid"] for i in releases]
+        # uploaded already, or leased by another instance of the bot
+        skip = await self.db.get_uploaded_anime(uids)
+        skip |= await self.db.get_leased_releases(uids)
+        releases = [i for i in releases if i["uid"] not in skip]
+        return sorted(releases, key=lambda i: i["published"] or 0)
+
+    async def feed_optimizer(self):
+        """Process the latest anime releases and filter out batches."""
+        releases = await self.feed_backlog()
+        return releases[0] if releases else None
+
+    async def catch_up(self, function, releases):
+        """Work through a backlog with boosted concurrency until caught up."""
+        LOGS.info(f"Catching Up On {len(releases)} Missed Release(s)...")
+        self.pipeline.boost(True)
+        semaphore = asyncio.Semaphore(max(1, Var.CATCHUP_FACTOR))
+
+        async def _run(data):
+            async with semaphore:
+                if not self.pipeline.draining:
+                    await function(data)
 
-    async def generate_360p(self, file_path, output_path):
-        """Convert 480p file to 360p using ffmpeg."""
         try:
-            LOGS.info(f"Generating 360p version for {file_path}...")
-            cmd = f"ffmpeg -i {file_path} -vf scale=-1:360 -c:v libx264 -preset fast -crf 28 -c:a copy {output_path}"
-            process = await asyncio.create_subprocess_shell(cmd)
-            await process.communicate()
-            LOGS.info(f"✅ 360p version saved at {output_path}")
-            return output_path
-        except Exception as e:
-            LOGS.error(f"❌ Error generating 360p: {e}")
-            return None
+            await asyncio.gather(*[_run(data) for data in releases])
+            while self.pipeline.releases and not self.pipeline.draining:
+                await asyncio.sleep(5)
+                for data in await self.feed_backlog():
+                    await function(data)
+        finally:
+            self.pipeline.boost(False)
+        LOGS.info("Caught Up, Back To Normal Polling")
 
     async def on_new_anime(self, function):
         """Continuously check for new anime releases."""
         for _ in count():
-            data = await self.feed_optimizer()
-            if data:
-                # ✅ Generate 360p from 480p before processing
-                file_480p = f"downloads/{data['480p'].title}"
-                file_360p = file_480p.replace("480p", "360p")
-
-                converted_360p = await self.generate_360p(file_480p, file_360p)
-                if converted_360p:
-                    data["360p"] = {"title": file_360p, "link": file_360p}
-
-                await function(data)
-                await self.db.add_anime(data.get("uid"))
+            if self.pipeline and self.pipeline.draining:
+                await asyncio.sleep(5)
+                continue
+            releases = await self.feed_backlog()
+            if self.pipeline and len(releases) >= max(2, Var.CATCHUP_THRESHOLD):
+                await self.catch_up(function, releases)
+            elif releases:
+                # the pipeline marks the release as uploaded once every
+                # resolution has left it
+                await function(releases[0])
 
             await asyncio.sleep(5)
-            
@@ -0,0 +1,244 @@
+#    This file is part of the AutoAnime distribution.
+#    Copyright (c) 2025 Kaif_00z
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, version 3.
+#
+#    This program is distributed in the hope that it will be useful, but
+#    WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+#    General Public License for more details.
+#
+# License can be found in <
+# https://github.com/kaif-00z/AutoAnimeBot/blob/main/LICENSE > .
+
+# if you are using this following code then don't forgot to give proper
+# credit to t.me/kAiF_00z (github.com/kaif-00z)
+
+import asyncio
+import os
+import signal
+import time
+
+from functions.config import Var
+from libs.logger import LOGS
+
+TICKS = os.sysconf("SC_CLK_TCK")
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+
+class ProcessStats:
+    def __init__(self):
+        self.attempts = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.max_rss = 0
+        self.frames = 0
+        self.speed = 0.0
+
+    def __str__(self):
+        return (
+            f"{self.attempts} Attempt(s), {round(self.wall)}s Wall, "
+            f"{round(self.cpu)}s CPU, {self.max_rss // 2**20} MiB Peak RSS"
+        ) + (f", {self.frames} Frames At {self.speed}x" if self.frames else "")
+
+
+class ProcessResult:
+    def __init__(self, returncode, out, err, stats, reason=None):
+        self.returncode = returncode
+        self.out = out
+        self.err = err
+        self.stats = stats
+        self.reason = reason
+
+    @property
+    def ok(self):
+        return self.returncode == 0 and not self.reason
+
+    @property
+    def error(self):
+        return self.reason or self.err or f"Exited With {self.returncode}"
+
+
+class Supervisor:
+    """Runs a command (exec, never through sh) and keeps an eye on it.
+
+    The child gets its own session so a timeout, a stall or a cancelled
+    caller kills and reaps the whole process group. A stall is no new
+    output for `stall` seconds, or no change in size/mtime of the `watch`
+    paths when given. CPU time and RSS of the group are sampled from /proc.
+
+    With a `progress` parser, stdout is streamed into it instead of being
+    kept, and only ffmpeg progress that moves the frame or output time on
+    counts against a stall.
+    """
+
+    async def run(
+        self,
+        args,
+        resource=None,
+        timeout=None,
+        stall=None,
+        watch=(),
+        retries=0,
+        backoff=None,
+        name=None,
+        progress=None,
+    ):
+        name = name or os.path.basename(args[0])
+        stats = ProcessStats()
+        for attempt in range(retries + 1):
+            result = await self._run(
+                args, resource, timeout, stall, watch, stats, progress
+            )
+            if result.ok or result.reason == "NOT_FOUND":
+                break
+            if attempt < retries:
+                delay = (backoff or Var.PROCESS_BACKOFF) * 2**attempt
+                LOGS.warning(
+                    f"{name} Failed ({result.reason or result.returncode}), "
+                    f"Retrying In {delay}s"
+                )
+                await asyncio.sleep(delay)
+        LOGS.info(f"{name}: {stats}")
+        return result
+
+    async def _run(self, args, resource, timeout, stall, watch, stats, progress):
+        stats.attempts += 1
+        started = time.time()
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *(resource.prefix() if resource else []),
+                *args,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                start_new_session=True,
+            )
+        except FileNotFoundError:
+            return ProcessResult(
+                None, "", f"{args[0].upper()}_NOT_FOUND", stats, "NOT_FOUND"
+            )
+        out, err = bytearray(), bytearray()
+        seen = [started]
+        marker = [0, 0.0]
+
+        async def read(stream, buffer, parser=None):
+            while chunk := await stream.read(65536):
+                if parser:
+                    parser.feed(chunk)
+                    continue
+                buffer += chunk
+                if not watch and not progress:
+                    seen[0] = time.time()
+
+        def advanced(event):
+            stats.frames, stats.speed = event.frame, event.speed
+            if event.frame > marker[0] or event.out_time > marker[1]:
+                marker[:] = [event.frame, event.out_time]
+                seen[0] = time.time()
+
+        if progress:
+            progress.reset()
+            progress.subscribe(advanced)
+        readers = asyncio.gather(
+            read(process.stdout, out, progress), read(process.stderr, err)
+        )
+        waiter = asyncio.ensure_future(process.wait())
+        cpu = stats.cpu
+        marks = self.marks(watch)
+        reason = None
+        try:
+            while not waiter.done():
+                await asyncio.wait({waiter}, timeout=2)
+                used, rss = self.usage(process.pid)
+                stats.cpu = max(stats.cpu, cpu + used)
+                stats.max_rss = max(stats.max_rss, rss)
+                now = time.time()
+                if watch and self.marks(watch) != marks:
+                    marks = self.marks(watch)
+                    seen[0] = now
+                if waiter.done():
+                    break
+                if timeout and now - started > timeout:
+                    reason = "TIMEOUT"
+                elif stall and now - seen[0] > stall:
+                    reason = "STALLED"
+                if reason:
+                    LOGS.error(f"{args[0]} {reason}, Killing PID {process.pid}")
+                    break
+        finally:
+            # also runs when the caller is cancelled, so nothing is left behind
+            await self.kill(process)
+            try:
+                await asyncio.wait_for(readers, 10)
+            except BaseException:
+                readers.cancel()
+            if progress:
+                progress.subscribers.remove(advanced)
+            stats.wall += time.time() - started
+        return ProcessResult(
+            process.returncode,
+            out.decode(errors="ignore").strip(),
+            err.decode(errors="ignore").strip(),
+            stats,
+            reason,
+        )
+
+    async def kill(self, process):
+        if process.returncode is None:
+            try:
+                os.killpg(process.pid, signal.SIGTERM)
+                await asyncio.wait_for(process.wait(), 10)
+            except asyncio.TimeoutError:
+                pass
+            except ProcessLookupError:
+                pass
+        try:
+            # the leader may be gone while its children still hold the pipes
+            os.killpg(process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+        await process.wait()
+
+    def marks(self, paths):
+        marks = []
+        for path in paths:
+            try:
+                if os.path.isdir(path):
+                    # aria2c preallocates, so a file's mtime moves, not its size
+                    stats = [
+                        os.stat(os.path.join(root, file))
+                        for root, _, files in os.walk(path)
+                        for file in files
+                    ]
+                    marks.append(
+                        (
+                            sum(i.st_size for i in stats),
+                            max((i.st_mtime for i in stats), default=0),
+                        )
+                    )
+                else:
+                    stat = os.stat(path)
+                    marks.append((stat.st_size, stat.st_mtime))
+            except OSError:
+                marks.append(None)
+        return marks
+
+    def usage(self, pgid):
+        cpu = rss = 0
+        for pid in os.listdir("/proc"):
+            if not pid.isdigit():
+                continue
+            try:
+                with open(f"/proc/{pid}/stat") as file:
+                    fields = file.read().rsplit(")", 1)[1].split()
+            except OSError:
+                continue
+            # fields start at "state", so pgrp, utime, stime and rss are
+            # stat fields 5, 14, 15 and 24
+            if int(fields[2]) != pgid:
+                continue
+            cpu += (int(fields[11]) + int(fields[12])) / TICKS
+            rss += int(fields[21]) * PAGE_SIZE
+        return cpu, rss
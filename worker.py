@@ -0,0 +1,15 @@
+# standalone encode node, run `python3 worker.py` with the same .env as
+# the bot and set REMOTE_ENCODE=True on the bot
+
+import asyncio
+
+from core.worker import EncodeWorker
+from database import DataBase
+from libs.ariawarp import Torrent
+
+worker = EncodeWorker(DataBase(), Torrent())
+
+try:
+    asyncio.run(worker.run())
+except KeyboardInterrupt:
+    pass